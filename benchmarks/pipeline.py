@@ -0,0 +1,150 @@
+"""End-to-end benchmark of tweet_weather() against the local stand-in.
+
+Starts benchmarks/standin.py in-process, points every provider, the Gist API,
+Cohere and X at it, and runs the real pipeline. For each scenario it reports
+wall time, time per stage (from bot.run_report) and request counts per
+service. Scenarios are the
+configured ZONES/HYD_ZONES plus synthetic configs of --sizes locations. Each
+scenario runs once with cold caches and once warm.
+
+    python benchmarks/pipeline.py --sizes 100,1000,5000 --latency-ms 40 --json bench.json
+"""
+import argparse, contextlib, io, json, os, sys, tempfile, time
+from types import SimpleNamespace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from standin import add_standin_args, standin_from_args
+
+class StandInCohere:
+    def __init__(self, bot, base):
+        self.bot = bot
+        self.base = base
+
+    def _post(self, endpoint, payload):
+        response = self.bot.http_request("cohere", "POST", f"{self.base}/cohere/v1/{endpoint}", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def chat(self, **kwargs):
+        return SimpleNamespace(text=self._post("chat", kwargs)["text"])
+
+    def generate(self, **kwargs):
+        data = self._post("generate", kwargs)
+        return SimpleNamespace(generations=[SimpleNamespace(text=g["text"]) for g in data["generations"]])
+
+class StandInTwitter:
+    def __init__(self, bot, base):
+        self.bot = bot
+        self.base = base
+
+    def create_tweet(self, text):
+        response = self.bot.http_request("twitter", "POST", f"{self.base}/2/tweets", json={"text": text})
+        response.raise_for_status()
+        return SimpleNamespace(data=response.json()["data"])
+
+def import_bot(base, deadline):
+    os.environ.update({
+        "OWM_API_BASE": base,
+        "WEATHERBIT_API_BASE": base,
+        "WEATHERAPI_API_BASE": base,
+        "GITHUB_API_BASE": base,
+        "FETCH_DEADLINE": str(deadline),
+        "OPENWEATHER_KEY": "standin",
+        "WEATHERBIT_API_KEY": "standin",
+        "WEATHERAPI_KEY": "standin",
+    })
+    import bot
+    bot.get_cohere_client = lambda: StandInCohere(bot, base)
+    bot.get_twitter_client = lambda: StandInTwitter(bot, base)
+    return bot
+
+def fresh_state(bot, cache_dir):
+    bot.coords_cache = bot.CoordsCache(path=os.path.join(cache_dir, bot.GIST_FILENAME))
+    bot.response_cache = bot.ResponseCache(path=os.path.join(cache_dir, "responses.json"))
+    bot.tweet_cache = bot.TweetCache(path=os.path.join(cache_dir, "tweets.json"))
+    bot.state_store = bot.GistStateStore("standin", "standin-token")
+    bot.forecast_archive = bot.ForecastArchive(os.path.join(cache_dir, "archive"))
+    bot.refresh_scheduler = bot.RefreshScheduler()
+
+def synthetic_zones(count, zone_size=8):
+    zones = {}
+    for i in range(count):
+        zones.setdefault(f"Synthetic Zone {i // zone_size:04d}", []).append(f"Synthetic Place {i:05d}")
+    return zones
+
+def run_once(bot, standin, verbose):
+    standin.reset_counts()
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        bot.tweet_weather(report_path=None)
+    wall = time.perf_counter() - start
+    stages = bot.run_report.stage_totals()
+    return {
+        "wall_s": round(wall, 3),
+        "stages_s": {name: round(t["seconds"], 3) for name, t in stages.items()},
+        "requests": standin.stats(),
+        "total_requests": sum(s["requests"] for s in standin.stats().values()),
+    }
+
+def run_scenario(bot, standin, name, zones, hyd_zones, verbose):
+    bot.ZONES, bot.HYD_ZONES = zones, hyd_zones
+    standin.reset()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fresh_state(bot, cache_dir)
+        cold = run_once(bot, standin, verbose)
+        warm = run_once(bot, standin, verbose)
+    locations = len({city for z in (zones, hyd_zones) for cities in z.values() for city in cities})
+    return {"scenario": name, "locations": locations, "cold": cold, "warm": warm}
+
+def print_result(result):
+    print(f"\n== {result['scenario']} ({result['locations']} locations)")
+    for phase in ("cold", "warm"):
+        run = result[phase]
+        print(f"  {phase}: wall {run['wall_s']:.2f}s, {run['total_requests']} requests")
+        for stage, seconds in run["stages_s"].items():
+            print(f"    {stage:<24} {seconds:8.3f}s")
+        for service, stats in run["requests"].items():
+            print(f"    {service:<12} {stats['requests']:6d} req {stats['bytes'] / 1024:10.1f} KiB"
+                  f"  {stats['injected_failures']} injected failures")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,5000",
+                        help="comma-separated synthetic location counts ('' to skip)")
+    parser.add_argument("--deadline", type=float, default=600, help="FETCH_DEADLINE for the runs")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the bot's per-provider rate limiters (off by default)")
+    parser.add_argument("--quotas", action="store_true",
+                        help="keep the daily provider quotas (off by default, so every cell is fetched)")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own output")
+    add_standin_args(parser)
+    args = parser.parse_args()
+
+    standin = standin_from_args(args)
+    base = standin.start()
+    bot = import_bot(base, args.deadline)
+    if not args.rate_limits:
+        bot.rate_limiters.clear()
+    if not args.quotas:
+        bot.PROVIDER_DAILY_QUOTAS.clear()
+
+    results = [run_scenario(bot, standin, "configured zones", bot.ZONES, bot.HYD_ZONES, args.verbose)]
+    print_result(results[-1])
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        results.append(run_scenario(bot, standin, f"synthetic {size}", synthetic_zones(size), {},
+                                    args.verbose))
+        print_result(results[-1])
+
+    standin.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
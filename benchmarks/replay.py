@@ -0,0 +1,127 @@
+"""Replay the forecast archive through the alert rules.
+
+Runs in the archive written by bot.ForecastArchive are sliced straight out of
+the memory-mapped columns, --chunk consecutive runs at a time, and counted with
+RuleSet.count_alerts(), which gives the alerts evaluate_arrays() would return
+without formatting them, either with the live alert_rules.json or with a
+candidate rule file. Reports
+alerts per rule, how often providers disagree, and throughput.
+
+    python benchmarks/replay.py --rules candidate_rules.json --since 2026-07-01 --json replay.json
+"""
+import argparse, json, os, sys, time
+from collections import Counter
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import numpy as np
+import bot
+
+def parse_day(text):
+    return datetime.strptime(text, "%Y-%m-%d").timestamp() if text else None
+
+def disagreement(rules, values):
+    """Per rule: (hours any provider matched, of those where a provider with data did not, solo hits per provider).
+
+    Column 0 only carries daily rain flags, so it is left out.
+    """
+    values = values[:, 1:]
+    daily = np.zeros((values.shape[0], values.shape[2]), dtype=bool)
+    available = ~np.isnan(values[..., 0])
+    stats = []
+    for rule in rules.rules:
+        hits = rules.match(rule, values, daily)
+        matched = hits.any(axis=-1)
+        split = matched & (available & ~hits).any(axis=-1)
+        solo = hits & (hits.sum(axis=-1) == 1)[..., None] & (available.sum(axis=-1) > 1)[..., None]
+        stats.append((int(matched.sum()), int(split.sum()), solo.sum(axis=(0, 1))))
+    return stats
+
+def chunks(selected, size):
+    """Split selected run indexes into consecutive ranges of at most size runs."""
+    start = 0
+    for i in range(1, len(selected) + 1):
+        if i == len(selected) or selected[i] != selected[i - 1] + 1 or i - start == size:
+            yield int(selected[start]), int(selected[i - 1]) + 1
+            start = i
+
+def replay(archive, rules, since=None, until=None, chunk=256):
+    tables = archive.read()
+    times = tables["runs"]["time"]
+    selected = np.flatnonzero((times >= (since or 0)) & (times < (until or np.inf)))
+    labels = [rule.label for rule in rules.rules]
+
+    alerts = Counter()
+    matched, split = Counter(), Counter()
+    solo = {label: Counter() for label in labels}
+    locations = 0
+    evaluate_seconds = 0.0
+    start = time.perf_counter()
+    for first, stop in chunks(selected, chunk):
+        t0 = time.perf_counter()
+        _, ids, values, daily, now = archive.runs_arrays(tables, first, stop, rules.providers)
+        counts = rules.count_alerts(values, daily, now)
+        evaluate_seconds += time.perf_counter() - t0
+
+        locations += len(ids)
+        for label, count in zip(labels, counts):
+            alerts[label] += count
+        for label, (m, s, per_provider) in zip(labels, disagreement(rules, values)):
+            matched[label] += m
+            split[label] += s
+            for provider, count in zip(rules.providers, per_provider):
+                solo[label][provider] += int(count)
+    wall = time.perf_counter() - start
+
+    return {
+        "runs": len(selected),
+        "first_run": datetime.fromtimestamp(times[selected[0]]).isoformat() if len(selected) else None,
+        "last_run": datetime.fromtimestamp(times[selected[-1]]).isoformat() if len(selected) else None,
+        "locations_evaluated": locations,
+        "alerts": {label: alerts[label] for label in labels},
+        "disagreement": {
+            label: {
+                "hours_matched": matched[label],
+                "hours_disputed": split[label],
+                "disputed_share": round(split[label] / matched[label], 3) if matched[label] else 0.0,
+                "solo_hits": dict(solo[label]),
+            }
+            for label in labels
+        },
+        "wall_s": round(wall, 3),
+        "evaluate_s": round(evaluate_seconds, 3),
+        "runs_per_s": round(len(selected) / evaluate_seconds, 1) if evaluate_seconds else None,
+    }
+
+def print_result(result):
+    print(f"Replayed {result['runs']} runs ({result['first_run']} – {result['last_run']}), "
+          f"{result['locations_evaluated']} location evaluations")
+    print(f"  evaluate {result['evaluate_s']:.3f}s ({result['runs_per_s']} runs/s), wall {result['wall_s']:.3f}s")
+    for label, count in result["alerts"].items():
+        d = result["disagreement"][label]
+        solo = ", ".join(f"{p} {n}" for p, n in d["solo_hits"].items())
+        print(f"  {label:<10} {count:7d} alerts  {d['hours_disputed']:7d}/{d['hours_matched']:<7d} hours disputed"
+              f" ({d['disputed_share']:.1%})  solo: {solo}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--archive", default=bot.FORECAST_ARCHIVE_DIR, help="archive directory (default: %(default)s)")
+    parser.add_argument("--rules", default=bot.ALERT_RULES_FILE, help="rule file to evaluate (default: %(default)s)")
+    parser.add_argument("--since", default=None, help="first day to replay, YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="day to stop before, YYYY-MM-DD")
+    parser.add_argument("--chunk", type=int, default=256, help="runs evaluated per pass (default: %(default)s)")
+    parser.add_argument("--json", default=None, help="write results to this file")
+    args = parser.parse_args()
+
+    result = replay(bot.ForecastArchive(args.archive), bot.RuleSet.load(args.rules),
+                    parse_day(args.since), parse_day(args.until), args.chunk)
+    print_result(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nResults written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Local stand-in for every HTTP service the bot talks to.
+
+Serves OWM (geocoding, onecall, current), Weatherbit, WeatherAPI, the Gist
+API, Cohere and the X tweet endpoint from one ThreadingHTTPServer. Forecast
+payloads are synthetic but shaped like the real responses, or replayed from
+recorded JSON files (--fixtures) with their timestamps shifted to now.
+OWM's exclude parameter is honoured and responses are gzipped when the
+client accepts it, so byte counts match what goes over the wire.
+Latency and failures can be injected per service.
+
+    python benchmarks/standin.py --port 8800 --latency-ms 40 --fail-rate 0.02
+"""
+import argparse, gzip, hashlib, json, os, random, threading, time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Roughly Telangana's bounding box, for geocoding made-up names
+LAT_RANGE = (15.8, 19.9)
+LON_RANGE = (77.2, 81.3)
+
+DESCRIPTIONS = ["clear sky", "few clouds", "scattered clouds", "light rain", "moderate rain", "thunderstorm"]
+
+FIXTURE_FILES = {
+    "owm": "owm_onecall.json",
+    "weatherbit": "weatherbit_hourly.json",
+    "weatherapi": "weatherapi_forecast.json",
+}
+
+def classify(path):
+    if path.startswith("/geo/"):
+        return "geocode"
+    if path.startswith("/data/2.5/onecall"):
+        return "owm"
+    if path.startswith("/data/2.5/weather"):
+        return "owm_current"
+    if path.startswith("/v2.0/"):
+        return "weatherbit"
+    if path.startswith("/v1/forecast.json") or path.startswith("/v1/current.json"):
+        return "weatherapi"
+    if path.startswith("/gists"):
+        return "github"
+    if path.startswith("/cohere/"):
+        return "cohere"
+    if path.startswith("/2/tweets"):
+        return "twitter"
+    return "unknown"
+
+def seeded(*parts):
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).digest()
+    return random.Random(digest)
+
+def fake_coords(name):
+    rng = seeded("geo", name.lower())
+    return round(rng.uniform(*LAT_RANGE), 4), round(rng.uniform(*LON_RANGE), 4)
+
+def hour_start(now=None):
+    now = now or time.time()
+    return int(now // 3600 * 3600)
+
+def synthetic_hours(lat, lon, count):
+    """(ts, temp, pop, precip, description) for the next count hours."""
+    start = hour_start()
+    rng = seeded(round(lat, 2), round(lon, 2), start // 3600)
+    base = rng.uniform(18, 41)
+    wet = rng.random() < 0.4
+    hours = []
+    for i in range(count):
+        temp = round(base + rng.uniform(-3, 3), 1)
+        pop = round(rng.uniform(0.3, 0.9), 2) if wet and rng.random() < 0.5 else round(rng.uniform(0, 0.08), 2)
+        precip = round(rng.uniform(0.2, 6), 1) if pop >= 0.5 else 0
+        desc = rng.choice(DESCRIPTIONS[3:] if precip else DESCRIPTIONS[:3])
+        hours.append((start + i * 3600, temp, pop, precip, desc))
+    return hours
+
+def owm_onecall(lat, lon):
+    hourly = []
+    for ts, temp, pop, precip, desc in synthetic_hours(lat, lon, 48):
+        hour = {
+            "dt": ts, "temp": temp, "feels_like": temp + 1.5, "pressure": 1006, "humidity": 62,
+            "dew_point": temp - 6, "uvi": 3.1, "clouds": 40, "visibility": 10000,
+            "wind_speed": 3.2, "wind_deg": 240, "wind_gust": 5.4, "pop": pop,
+            "weather": [{"id": 500 if precip else 802, "main": "Rain" if precip else "Clouds",
+                         "description": desc, "icon": "10d" if precip else "03d"}],
+        }
+        if precip:
+            hour["rain"] = {"1h": precip}
+        hourly.append(hour)
+    daily = [
+        {"dt": hourly[0]["dt"] + d * 86400, "temp": {"min": 22, "max": 34, "day": 31, "night": 24},
+         "pop": 0.2, "weather": [{"id": 802, "main": "Clouds", "description": "scattered clouds", "icon": "03d"}],
+         "summary": "Expect a day of partly cloudy skies"}
+        for d in range(8)
+    ]
+    return {"lat": lat, "lon": lon, "timezone": "Asia/Kolkata", "timezone_offset": 19800,
+            "current": dict(hourly[0]), "hourly": hourly, "daily": daily}
+
+def weatherbit_hourly(lat, lon, hours):
+    data = []
+    for ts, temp, pop, precip, desc in synthetic_hours(lat, lon, hours):
+        local = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts + 19800))
+        data.append({
+            "ts": ts, "timestamp_local": local,
+            "timestamp_utc": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)),
+            "temp": temp, "app_temp": temp + 1, "rh": 60, "pop": int(pop * 100), "precip": precip,
+            "clouds": 40, "wind_spd": 3.1, "wind_cdir": "SW",
+            "weather": {"description": desc.capitalize(), "code": 500 if precip else 802, "icon": "c02d"},
+        })
+    return {"city_name": "Stand-in", "lat": lat, "lon": lon, "timezone": "Asia/Kolkata", "data": data}
+
+def weatherapi_forecast(lat, lon):
+    hours = synthetic_hours(lat, lon, 24)
+    hour = [
+        {"time_epoch": ts, "time": time.strftime("%Y-%m-%d %H:%M", time.gmtime(ts + 19800)),
+         "temp_c": temp, "temp_f": temp * 9 / 5 + 32, "precip_mm": precip, "chance_of_rain": int(pop * 100),
+         "will_it_rain": int(precip > 0), "humidity": 60, "condition": {"text": desc.capitalize(), "code": 1000}}
+        for ts, temp, pop, precip, desc in hours
+    ]
+    total = round(sum(h[3] for h in hours), 1)
+    return {
+        "location": {"name": "Stand-in", "region": "Telangana", "country": "India", "lat": lat, "lon": lon,
+                     "tz_id": "Asia/Kolkata"},
+        "current": {"temp_c": hours[0][1], "condition": {"text": hours[0][4].capitalize()}},
+        "forecast": {"forecastday": [{
+            "date": time.strftime("%Y-%m-%d", time.gmtime(hours[0][0] + 19800)),
+            "day": {"maxtemp_c": max(h[1] for h in hours), "mintemp_c": min(h[1] for h in hours),
+                    "totalprecip_mm": total, "daily_will_it_rain": int(total > 0),
+                    "daily_chance_of_rain": 80 if total else 0},
+            "hour": hour,
+        }]},
+    }
+
+def shift_fixture(service, payload):
+    """Move a recorded payload's timestamps so its first hour is the current hour."""
+    payload = json.loads(json.dumps(payload))
+    if service == "owm":
+        rows, field = payload.get("hourly", []), "dt"
+    elif service == "weatherbit":
+        rows, field = payload.get("data", []), "ts"
+    else:
+        rows, field = payload["forecast"]["forecastday"][0]["hour"], "time_epoch"
+    if rows:
+        delta = hour_start() - rows[0][field]
+        for row in rows:
+            row[field] += delta
+    return payload
+
+class StandIn:
+    def __init__(self, latency_ms=0, latency=None, fail_rate=0.0, slow_rate=0.0, slow_ms=5000,
+                 fixtures=None, seed=0):
+        self.latency_ms = latency_ms
+        self.latency = latency or {}
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.fixtures = {}
+        if fixtures:
+            for service, name in FIXTURE_FILES.items():
+                path = os.path.join(fixtures, name)
+                if os.path.exists(path):
+                    with open(path) as f:
+                        self.fixtures[service] = json.load(f)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.gist_files = {}
+        self.reset_counts()
+        self.server = None
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts = defaultdict(int)
+            self.bytes = defaultdict(int)
+            self.failures = defaultdict(int)
+
+    def reset(self):
+        self.reset_counts()
+        with self.lock:
+            self.gist_files = {}
+
+    def stats(self):
+        with self.lock:
+            return {
+                service: {"requests": self.counts[service], "bytes": self.bytes[service],
+                          "injected_failures": self.failures[service]}
+                for service in sorted(self.counts)
+            }
+
+    def delay_and_fault(self, service):
+        """Sleep for the configured latency; returns True when this request should fail."""
+        with self.lock:
+            fail = self.rng.random() < self.fail_rate
+            slow = self.rng.random() < self.slow_rate
+        delay = self.latency.get(service, self.latency_ms)
+        if slow:
+            delay += self.slow_ms
+        if delay:
+            time.sleep(delay / 1000)
+        if fail:
+            with self.lock:
+                self.failures[service] += 1
+        return fail
+
+    def respond(self, service, method, path, query, body):
+        q = {k: v[0] for k, v in query.items()}
+        if service == "geocode":
+            name = q.get("q", "").split(",")[0]
+            lat, lon = fake_coords(name)
+            return 200, [{"name": name, "lat": lat, "lon": lon, "country": "IN", "state": "Telangana"}]
+        if service == "owm":
+            lat, lon = float(q["lat"]), float(q["lon"])
+            if "owm" in self.fixtures:
+                payload = shift_fixture("owm", self.fixtures["owm"])
+            else:
+                payload = owm_onecall(lat, lon)
+            for block in q.get("exclude", "").split(","):
+                payload.pop(block, None)
+            return 200, payload
+        if service == "owm_current":
+            city = q.get("q", "Hyderabad")
+            return 200, {"name": city, "weather": [{"description": "haze"}], "main": {"temp": 29.4}}
+        if service == "weatherbit":
+            if path.startswith("/v2.0/current"):
+                return 200, {"data": [{"temp": 29.0, "weather": {"description": "Haze"}}]}
+            if "weatherbit" in self.fixtures:
+                return 200, shift_fixture("weatherbit", self.fixtures["weatherbit"])
+            return 200, weatherbit_hourly(float(q["lat"]), float(q["lon"]), int(q.get("hours", 24)))
+        if service == "weatherapi":
+            if path.startswith("/v1/current.json"):
+                return 200, {"current": {"temp_c": 29.0, "condition": {"text": "Haze"}}}
+            if "weatherapi" in self.fixtures:
+                return 200, shift_fixture("weatherapi", self.fixtures["weatherapi"])
+            lat, lon = (float(x) for x in q["q"].split(","))
+            return 200, weatherapi_forecast(lat, lon)
+        if service == "github":
+            with self.lock:
+                if method == "PATCH":
+                    for name, meta in json.loads(body or b"{}").get("files", {}).items():
+                        self.gist_files[name] = meta["content"]
+                files = {name: {"filename": name, "content": content, "truncated": False}
+                         for name, content in self.gist_files.items()}
+            return 200, {"id": "standin", "files": files}
+        if service == "cohere":
+            text = "🌦️ Weather Update\n📍 Stand-in zones: 🌧️ Rain in evening\nStay safe!"
+            if path.endswith("/generate"):
+                return 200, {"generations": [{"text": text}]}
+            return 200, {"text": text}
+        if service == "twitter":
+            with self.lock:
+                tweet_id = str(1_000_000 + self.counts["twitter"])
+            return 201, {"data": {"id": tweet_id, "text": json.loads(body or b"{}").get("text", "")}}
+        return 404, {"error": f"no stand-in route for {path}"}
+
+    def handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_any(self):
+                parsed = urlparse(self.path)
+                service = classify(parsed.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if standin.delay_and_fault(service):
+                    status, payload = 503, {"error": "injected failure"}
+                else:
+                    status, payload = standin.respond(service, self.command, parsed.path,
+                                                      parse_qs(parsed.query), body)
+                data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+                gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzipped:
+                    data = gzip.compress(data, compresslevel=5)
+                with standin.lock:
+                    standin.counts[service] += 1
+                    standin.bytes[service] += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = handle_any
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+def parse_latency(spec):
+    """'owm=80,weatherbit=200' -> {'owm': 80.0, 'weatherbit': 200.0}"""
+    latency = {}
+    for part in filter(None, (spec or "").split(",")):
+        service, ms = part.split("=")
+        latency[service.strip()] = float(ms)
+    return latency
+
+def add_standin_args(parser):
+    parser.add_argument("--latency-ms", type=float, default=20, help="latency added to every request")
+    parser.add_argument("--latency", default="", help="per-service latency, e.g. owm=80,weatherbit=200")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=5000)
+    parser.add_argument("--fixtures", default=None, help="directory of recorded provider responses")
+    parser.add_argument("--seed", type=int, default=0)
+
+def standin_from_args(args):
+    return StandIn(
+        latency_ms=args.latency_ms, latency=parse_latency(args.latency), fail_rate=args.fail_rate,
+        slow_rate=args.slow_rate, slow_ms=args.slow_ms, fixtures=args.fixtures, seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8800)
+    add_standin_args(parser)
+    args = parser.parse_args()
+    standin = standin_from_args(args)
+    base = standin.start(port=args.port)
+    print(f"Stand-in listening on {base} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measure how long `import bot` takes in a fresh interpreter.
+
+Runs the import in clean subprocesses (no bot secrets in the environment),
+reports the median wall time and the slowest modules from -X importtime,
+and exits non-zero when the median exceeds --max-ms.
+
+    python benchmarks/startup.py --runs 10 --max-ms 800
+"""
+import argparse, os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRETS = (
+    "COHERE_API_KEY", "BEARER_TOKEN", "API_KEY", "API_SECRET", "ACCESS_TOKEN",
+    "ACCESS_SECRET", "GIST_ID", "GIST_TOKEN",
+)
+
+def clean_env():
+    env = {k: v for k, v in os.environ.items() if k not in SECRETS}
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+def time_import(env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import bot"], cwd=ROOT, env=env, check=True)
+    return (time.perf_counter() - start) * 1000
+
+def slowest_imports(env, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.rsplit("|", 2)
+        # Nested imports are indented past the single separator space
+        if not name.startswith("  "):
+            rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    env = clean_env()
+    time_import(env)  # warm the OS page cache
+    timings = [time_import(env) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import bot: median {median:.0f} ms, min {min(timings):.0f} ms over {args.runs} runs")
+
+    print("slowest top-level imports (cumulative):")
+    for us, name in slowest_imports(env, args.top):
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"❌ startup budget of {args.max_ms:.0f} ms exceeded")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
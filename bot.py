@@ -1,28 +1,205 @@
-import os, json, random, cohere
-from datetime import datetime, timedelta
+import os, re, json, math, random, time, threading, hashlib, argparse, signal, multiprocessing
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, Future, FIRST_COMPLETED
+from datetime import datetime
+from urllib.parse import urlsplit
+from functools import lru_cache
 import requests, pytz
-from github import Github, InputFileContent
-import tweepy
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # optional, only speeds up decoding
+    orjson = None
+
 load_dotenv()
-cohere_client = cohere.Client(os.getenv("COHERE_API_KEY"))
-
-ZONES = {
-    "North Telangana": ["Adilabad", "Nirmal", "Asifabad", "Mancherial", "Kamareddy"],
-    "South Telangana": ["Mahabubnagar", "Gadwal", "Wanaparthy", "Nagarkurnool", "Narayanpet"],
-    "East Telangana": ["Khammam", "Bhadrachalam", "Mahabubabad", "Warangal", "Suryapet"],
-    "West Telangana": ["Vikarabad", "Sangareddy", "Zaheerabad"],
-    "Central Telangana": ["Hyderabad", "Medchal", "Siddipet", "Nalgonda", "Karimnagar"]
-}
 
-HYD_ZONES = {
-    "North Hyderabad": ["Kompally", "Medchal", "Suchitra", "Bolarum"],
-    "South Hyderabad": ["LB Nagar", "Malakpet", "Falaknuma", "Kanchanbagh"],
-    "East Hyderabad": ["Uppal", "Ghatkesar", "Keesara"],
-    "West Hyderabad": ["Gachibowli", "Kondapur", "Madhapur", "Miyapur"],
-    "Central Hyderabad": ["Secunderabad", "Begumpet", "Nampally", "Abids"]
-}
+ZONES_FILE = os.getenv("ZONES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "zones.json"))
+
+class SpatialIndex:
+    """Points bucketed on a lat/lon grid for fast nearest-neighbour queries.
+
+    A lookup only scans the rings of grid cells around the query point until
+    no unscanned cell can hold anything closer, so it stays well under a
+    millisecond for thousands of points.
+    """
+
+    def __init__(self, cell_deg=0.25):
+        self.cell_deg = cell_deg
+        self.cells = defaultdict(list)
+        self.bounds = None
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def insert(self, lat, lon, item):
+        i, j = self._cell(lat, lon)
+        self.cells[(i, j)].append((lat, lon, item))
+        if self.bounds is None:
+            self.bounds = [i, i, j, j]
+        else:
+            self.bounds = [min(self.bounds[0], i), max(self.bounds[1], i),
+                           min(self.bounds[2], j), max(self.bounds[3], j)]
+
+    def __len__(self):
+        return sum(len(points) for points in self.cells.values())
+
+    def nearest(self, lat, lon):
+        """Return (item, distance_km) of the closest point, or (None, inf)."""
+        if self.bounds is None:
+            return None, math.inf
+        ci, cj = self._cell(lat, lon)
+        coslat = math.cos(math.radians(lat))
+        max_ring = max(abs(ci - self.bounds[0]), abs(ci - self.bounds[1]),
+                       abs(cj - self.bounds[2]), abs(cj - self.bounds[3]))
+        best, best_d2 = None, math.inf
+        for ring in range(max_ring + 1):
+            # Anything in this ring or beyond is at least (ring - 1) cells away
+            if best is not None and best_d2 <= ((ring - 1) * self.cell_deg * coslat) ** 2:
+                break
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if max(abs(i - ci), abs(j - cj)) != ring:
+                        continue
+                    for plat, plon, item in self.cells.get((i, j), ()):
+                        d2 = (plat - lat) ** 2 + ((plon - lon) * coslat) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = item, d2
+        return best, math.sqrt(best_d2) * 111.2
+
+def point_in_polygon(lat, lon, polygon):
+    inside = False
+    for (lat1, lon1), (lat2, lon2) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (lat1 > lat) != (lat2 > lat):
+            if lon < (lon2 - lon1) * (lat - lat1) / (lat2 - lat1) + lon1:
+                inside = not inside
+    return inside
+
+class ZoneIndex:
+    """Assigns a point to a zone: by polygon when one contains it, else nearest centroid."""
+
+    def __init__(self, zones):
+        self.centroids = SpatialIndex()
+        self.polygons = []
+        for name, meta in zones.items():
+            if meta.get("centroid"):
+                self.centroids.insert(*meta["centroid"], name)
+            if meta.get("polygon"):
+                polygon = [tuple(p) for p in meta["polygon"]]
+                lats, lons = zip(*polygon)
+                self.polygons.append((min(lats), max(lats), min(lons), max(lons), polygon, name))
+
+    def zone_for(self, lat, lon):
+        for min_lat, max_lat, min_lon, max_lon, polygon, name in self.polygons:
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon and point_in_polygon(lat, lon, polygon):
+                return name
+        return self.centroids.nearest(lat, lon)[0]
+
+GAZETTEER_FILE = os.getenv(
+    "GAZETTEER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+)
+GAZETTEER_FUZZY_CUTOFF = 0.85
+PLACE_NOISE_WORDS = {"district", "dist", "mandal", "urban", "rural", "telangana", "india"}
+
+def place_key(name):
+    """Normalized lookup key: lower case, letters and digits only, no filler words."""
+    words = re.findall(r"[a-z0-9]+", name.lower().replace("&", " and "))
+    return "".join(w for w in words if w not in PLACE_NOISE_WORDS)
+
+class Gazetteer:
+    """Bundled place names and aliases -> coordinates.
+
+    Exact lookups are one dict hit on the normalized name. Misses are
+    matched with difflib against every known name and alias, and the
+    result (hit or miss) is remembered for the rest of the process.
+    """
+
+    def __init__(self, places):
+        self.coords = {}
+        self.names = {}
+        for name, lat, lon, aliases in places:
+            for alias in [name, *aliases]:
+                key = place_key(alias)
+                if key not in self.coords:
+                    self.coords[key] = (lat, lon)
+                    self.names[key] = name
+        self.fuzzy = {}
+
+    @classmethod
+    def load(cls, path=GAZETTEER_FILE):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f)["places"])
+        except (OSError, ValueError, KeyError) as e:
+            print("⚠️ Could not load gazetteer:", e)
+            return cls([])
+
+    def __len__(self):
+        return len(self.coords)
+
+    def lookup(self, name):
+        key = place_key(name)
+        if key in self.coords:
+            return self.coords[key]
+        if key not in self.fuzzy:
+            import difflib
+
+            match = difflib.get_close_matches(key, self.coords, n=1, cutoff=GAZETTEER_FUZZY_CUTOFF)
+            self.fuzzy[key] = match[0] if match else None
+            if match:
+                print(f"🔤 {name} matched gazetteer entry {self.names[match[0]]}")
+        return self.coords.get(self.fuzzy[key])
+
+@lru_cache(maxsize=1)
+def get_gazetteer():
+    return Gazetteer.load()
+
+def load_zone_config(path=ZONES_FILE):
+    """Read zone sets and locations from the zones file.
+
+    Locations are [name, lat, lon, zone_set, zone] rows; lat/lon may be null
+    (looked up in the gazetteer, else geocoded at run time) and zone may be
+    null (assigned through the zone set's ZoneIndex). Returns ({zone_set: {zone: [name, ...]}}, {name: (lat, lon)}).
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    zone_sets = {}
+    indexes = {}
+    for set_name, zones in config["zone_sets"].items():
+        zone_sets[set_name] = {zone: [] for zone in zones}
+        indexes[set_name] = ZoneIndex(zones)
+
+    coords = {}
+    for name, lat, lon, set_name, zone in config["locations"]:
+        if lat is None or lon is None:
+            lat, lon = get_gazetteer().lookup(name) or (None, None)
+        if lat is not None and lon is not None:
+            coords[name] = (lat, lon)
+            zone = zone or indexes[set_name].zone_for(lat, lon)
+        if not zone:
+            print(f"⚠️ {name} has neither coordinates nor a zone – skipping.")
+            continue
+        zone_sets[set_name].setdefault(zone, []).append(name)
+    return zone_sets, coords
+
+ZONE_SETS, CONFIG_COORDS = load_zone_config()
+ZONES = ZONE_SETS["telangana"]
+HYD_ZONES = ZONE_SETS["hyderabad"]
+
+def build_location_index(coords):
+    index = SpatialIndex(cell_deg=0.1)
+    for name, (lat, lon) in coords.items():
+        index.insert(lat, lon, name)
+    return index
+
+location_index = build_location_index(CONFIG_COORDS)
+
+def nearest_location(lat, lon):
+    """Closest configured location to a point, as (name, distance_km)."""
+    return location_index.nearest(lat, lon)
 
 TIME_BUCKETS = [
     "midnight",
@@ -35,79 +212,523 @@ TIME_BUCKETS = [
     "night"
 ]
 
-client = tweepy.Client(
-    bearer_token=os.getenv("BEARER_TOKEN"),
-    consumer_key=os.getenv("API_KEY"),
-    consumer_secret=os.getenv("API_SECRET"),
-    access_token=os.getenv("ACCESS_TOKEN"),
-    access_token_secret=os.getenv("ACCESS_SECRET")
-)
+# cohere and tweepy are slow to import and need credentials, so both
+# clients are only built the first time something actually uses them.
+@lru_cache(maxsize=None)
+def get_cohere_client():
+    import cohere
+    return cohere.Client(os.getenv("COHERE_API_KEY"))
+
+@lru_cache(maxsize=None)
+def get_twitter_client():
+    import tweepy
+    return tweepy.Client(
+        bearer_token=os.getenv("BEARER_TOKEN"),
+        consumer_key=os.getenv("API_KEY"),
+        consumer_secret=os.getenv("API_SECRET"),
+        access_token=os.getenv("ACCESS_TOKEN"),
+        access_token_secret=os.getenv("ACCESS_SECRET")
+    )
 
 OWM_API_KEY = os.getenv("OPENWEATHER_KEY")
 WEATHERAPI_KEY = os.getenv("WEATHERAPI_KEY")
 WEATHERBIT_API_KEY = os.getenv("WEATHERBIT_KEY")
-GIST_ID = os.environ["GIST_ID"]
-GIST_TOKEN = os.environ["GIST_TOKEN"]
 GIST_FILENAME = "coords_cache.json"
+LAST_TWEET_FILENAME = "last_tweet.json"
+RUN_STATE_FILENAME = "run_state.json"
+
+# Feed identity; a multi-region run sets these per region (see configure_region)
+REGION_NAME = os.getenv("REGION_NAME", "Telangana")
+CURRENT_WEATHER_CITY = os.getenv("CURRENT_WEATHER_CITY", "Hyderabad")
+TWEET_STYLE = os.getenv("TWEET_STYLE") or None
+
+CACHE_DIR = os.getenv("WEATHER_BOT_CACHE_DIR", ".cache")
+COORDS_CACHE_TTL = int(os.getenv("COORDS_CACHE_TTL", 7 * 24 * 3600))
+
+def dump_json_atomic(obj, path, **kwargs):
+    """json.dump via a temp file, so processes sharing the file never read half of it."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, **kwargs)
+    os.replace(tmp, path)
+
+# API hosts can be pointed elsewhere, e.g. at the benchmark stand-in
+OWM_API_BASE = os.getenv("OWM_API_BASE", "https://api.openweathermap.org")
+WEATHERBIT_API_BASE = os.getenv("WEATHERBIT_API_BASE", "https://api.weatherbit.io")
+WEATHERAPI_API_BASE = os.getenv("WEATHERAPI_API_BASE", "https://api.weatherapi.com")
+GITHUB_API_BASE = os.getenv("GITHUB_API_BASE", "https://api.github.com")
+
+BASE_FORECAST_URL = OWM_API_BASE + "/data/2.5/onecall?lat={}&lon={}&exclude=minutely,daily,alerts,current&appid={}&units=metric"
+BASE_CURRENT_URL = OWM_API_BASE + "/data/2.5/weather?q={}&appid={}&units=metric"
+
+class RunReport:
+    """Spans and outbound requests recorded during one run.
+
+    Written as JSON (and optionally Prometheus text format) at the end of
+    tweet_weather(). Request URLs are stored without their query string so
+    API keys never end up in the report.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.finished_at = None
+            self.spans = []
+            self.requests = []
+            self.info = {}
+
+    def add_span(self, name, duration, **attrs):
+        with self.lock:
+            self.spans.append({"name": name, "duration_s": round(duration, 6), **attrs})
+
+    def add_request(self, provider, method, url, status, size, duration, attrs=None):
+        parts = urlsplit(url)
+        with self.lock:
+            self.requests.append({
+                **(attrs or {}),
+                "provider": provider,
+                "method": method,
+                "url": f"{parts.netloc}{parts.path}",
+                "status": status,
+                "bytes": size,
+                "duration_s": round(duration, 6),
+            })
+
+    def stage_totals(self):
+        totals = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        for s in self.spans:
+            totals[s["name"]]["count"] += 1
+            totals[s["name"]]["seconds"] += s["duration_s"]
+        return {name: {"count": t["count"], "seconds": round(t["seconds"], 6)} for name, t in totals.items()}
+
+    def provider_totals(self):
+        totals = defaultdict(lambda: {"requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0})
+        for r in self.requests:
+            t = totals[r["provider"]]
+            t["requests"] += 1
+            t["errors"] += r["status"] is None or r["status"] >= 400
+            t["bytes"] += r["bytes"]
+            t["seconds"] += r["duration_s"]
+        return {p: {**t, "seconds": round(t["seconds"], 6)} for p, t in totals.items()}
+
+    def to_dict(self):
+        with self.lock:
+            finished = self.finished_at or time.time()
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at, pytz.utc).isoformat(),
+                "duration_s": round(finished - self.started_at, 6),
+                "info": dict(self.info),
+                "stages": self.stage_totals(),
+                "providers": self.provider_totals(),
+                "spans": list(self.spans),
+                "requests": list(self.requests),
+            }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+
+    def write_prometheus(self, path):
+        report = self.to_dict()
+        lines = [
+            "# HELP weather_bot_run_seconds Wall time of the last run.",
+            "# TYPE weather_bot_run_seconds gauge",
+            f"weather_bot_run_seconds {report['duration_s']}",
+            "# HELP weather_bot_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE weather_bot_stage_seconds gauge",
+        ]
+        lines += [f'weather_bot_stage_seconds{{stage="{name}"}} {t["seconds"]}' for name, t in report["stages"].items()]
+        for metric, key, help_text in (
+            ("weather_bot_requests", "requests", "Outbound HTTP requests (including retries)."),
+            ("weather_bot_request_errors", "errors", "Outbound requests that failed or returned >= 400."),
+            ("weather_bot_request_bytes", "bytes", "Response bytes received."),
+            ("weather_bot_request_seconds", "seconds", "Time spent waiting on outbound requests."),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{provider="{p}"}} {t[key]}' for p, t in report["providers"].items()]
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+run_report = RunReport()
+_span_context = threading.local()
+
+# Set by --profile; CPU-side spans opened with profile=True feed it
+profiler = None
+
+def span_attrs():
+    stack = getattr(_span_context, "stack", None)
+    return stack[-1] if stack else {}
+
+@contextmanager
+def span(name, profile=False, **attrs):
+    """Time a block and record it in run_report.
+
+    Attributes are inherited by nested spans and by requests sent from the
+    same thread, so an outbound request knows which city it was for.
+    """
+    attrs = {**span_attrs(), **attrs}
+    stack = _span_context.__dict__.setdefault("stack", [])
+    stack.append(attrs)
+    profiling = profile and profiler is not None
+    if profiling:
+        profiler.enable()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        if profiling:
+            profiler.disable()
+        stack.pop()
+        run_report.add_span(name, duration, status=status, **attrs)
+
+HTTP_TIMEOUT = 10
+HTTP_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
+
+# Max in-flight requests per provider
+PROVIDER_CONCURRENCY = {"owm": 8, "weatherbit": 4, "weatherapi": 8, "github": 2}
+
+# (requests per second, burst) sized to each provider's free tier
+PROVIDER_RATE_LIMITS = {
+    "owm": (1.0, 10),         # 60 calls/minute
+    "weatherbit": (2.0, 10),
+    "weatherapi": (5.0, 10),
+    "github": (1.0, 5),       # 5000 calls/hour
+}
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve a token; a negative balance is the wait for it
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+rate_limiters = {p: TokenBucket(*limits) for p, limits in PROVIDER_RATE_LIMITS.items()}
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(provider):
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            size = PROVIDER_CONCURRENCY.get(provider, 4)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _sessions[provider] = session
+        return session
+
+def backoff_delay(attempt, response=None):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(int(retry_after), BACKOFF_CAP)
+    # Full jitter: uniform over the exponential window
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+_deadline_context = threading.local()
+
+@contextmanager
+def request_deadline(seconds):
+    """Bound every http_request() made by this thread inside the block.
+
+    Request timeouts are shortened to the time left, and no retry is
+    started once the deadline has passed.
+    """
+    previous = getattr(_deadline_context, "deadline", None)
+    deadline = time.monotonic() + seconds
+    _deadline_context.deadline = min(deadline, previous) if previous else deadline
+    try:
+        yield
+    finally:
+        _deadline_context.deadline = previous
+
+@contextmanager
+def prepaid_token(provider):
+    """The next http_request() to provider in this thread uses a rate-limit token the caller already waited for."""
+    _deadline_context.prepaid = provider
+    try:
+        yield
+    finally:
+        _deadline_context.prepaid = None
+
+def http_request(provider, method, url, **kwargs):
+    """Send a request through the provider's pooled session.
+
+    Connection errors, timeouts and RETRY_STATUSES are retried with
+    jittered exponential backoff; the last response or error is returned
+    or raised as-is. Inside request_deadline() nothing runs past the
+    deadline.
+    """
+    timeout = kwargs.pop("timeout", HTTP_TIMEOUT)
+    deadline = getattr(_deadline_context, "deadline", None)
+    session = get_session(provider)
+    limiter = rate_limiters.get(provider)
+    prepaid = getattr(_deadline_context, "prepaid", None) == provider
+    if prepaid:
+        _deadline_context.prepaid = None
+    for attempt in range(HTTP_RETRIES + 1):
+        if limiter and not (attempt == 0 and prepaid):
+            limiter.acquire()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"{provider} deadline exceeded")
+            kwargs["timeout"] = min(timeout, remaining)
+        else:
+            kwargs["timeout"] = timeout
+        response = None
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            run_report.add_request(provider, method, url, None, 0, time.perf_counter() - start,
+                                   dict(span_attrs(), attempt=attempt, error=type(e).__name__))
+            if attempt == HTTP_RETRIES or (deadline is not None and time.monotonic() >= deadline):
+                raise
+            print(f"🔁 {provider} request failed ({type(e).__name__}), retrying")
+        else:
+            run_report.add_request(provider, method, url, response.status_code, len(response.content),
+                                   time.perf_counter() - start, dict(span_attrs(), attempt=attempt))
+            if response.status_code not in RETRY_STATUSES or attempt == HTTP_RETRIES:
+                return response
+            if deadline is not None and time.monotonic() >= deadline:
+                return response
+            print(f"🔁 {provider} returned HTTP {response.status_code}, retrying")
+        delay = backoff_delay(attempt, response)
+        if deadline is not None:
+            delay = min(delay, max(0, deadline - time.monotonic()))
+        time.sleep(delay)
+
+class GistStateStore:
+    """All bot state kept in the Gist, read with one GET and written with one PATCH.
+
+    Files are fetched and parsed on first access. Setters only mark a file
+    dirty, and flush() writes every dirty file back in a single request.
+    If the GET fails nothing is written, since a PATCH built on the empty
+    store would replace the real files, and flush() drops the store so the
+    next run loads it again.
+    """
+
+    def __init__(self, gist_id=None, token=None):
+        # Credentials default to GIST_ID / GIST_TOKEN, read on first use
+        self.gist_id = gist_id
+        self.token = token
+        self.url = None
+        self.headers = {}
+        self.files = None
+        self.load_failed = False
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.files is not None:
+            return
+        self.files = {}
+        gist_id = self.gist_id or os.getenv("GIST_ID")
+        token = self.token or os.getenv("GIST_TOKEN")
+        if not gist_id or not token:
+            print("⚠️ GIST_ID / GIST_TOKEN not set – state will not be persisted.")
+            return
+        url = f"{GITHUB_API_BASE}/gists/{gist_id}"
+        self.headers = {"Authorization": f"token {token}"}
+        try:
+            response = http_request("github", "GET", url, headers=self.headers)
+        except requests.RequestException as e:
+            print("❌ Failed to fetch gist:", e)
+            self.load_failed = True
+            return
+        if response.status_code != 200:
+            print(f"❌ Failed to fetch gist: {response.status_code}")
+            self.load_failed = True
+            return
+        self.url = url
+
+        for name, meta in response.json().get("files", {}).items():
+            content = meta.get("content")
+            if meta.get("truncated") and meta.get("raw_url"):
+                # Files over 1 MB are truncated in the gist listing
+                content = http_request("github", "GET", meta["raw_url"], headers=self.headers).text
+            try:
+                self.files[name] = json.loads(content)
+            except (TypeError, json.JSONDecodeError):
+                print(f"⚠️ Gist file '{name}' is not valid JSON — ignoring it.")
+
+    def get(self, name, default=None):
+        with self.lock:
+            self._load()
+            return self.files.get(name, default)
+
+    def set(self, name, value):
+        with self.lock:
+            self._load()
+            self.files[name] = value
+            self.dirty.add(name)
+
+    def flush(self):
+        with self.lock:
+            if self.load_failed:
+                print("⚠️ Gist could not be loaded – state not saved this run")
+                self.files = None
+                self.load_failed = False
+                self.dirty.clear()
+                return
+            if not self.dirty or not self.url:
+                return
+            payload = {
+                "files": {
+                    name: {"content": json.dumps(self.files[name], ensure_ascii=False, separators=(",", ":"))}
+                    for name in self.dirty
+                }
+            }
+            response = http_request("github", "PATCH", self.url, headers=self.headers, json=payload)
+            if response.status_code == 200:
+                print(f"✅ Saved {', '.join(sorted(self.dirty))} to Gist")
+                self.dirty.clear()
+            else:
+                print(f"❌ Failed to save state to Gist: {response.status_code}")
+
+    def coords(self):
+        return dict(self.get(GIST_FILENAME) or {})
+
+    def set_coords(self, coords):
+        self.set(GIST_FILENAME, coords)
+
+    def last_tweet(self):
+        return self.get(LAST_TWEET_FILENAME)
 
-BASE_FORECAST_URL = "https://api.openweathermap.org/data/2.5/onecall?lat={}&lon={}&exclude=minutely&appid={}&units=metric"
-BASE_CURRENT_URL = "https://api.openweathermap.org/data/2.5/weather?q={}&appid={}&units=metric"
+    def set_last_tweet(self, text, alerts_hash=None):
+        self.set(LAST_TWEET_FILENAME, {"text": text, "alerts_hash": alerts_hash})
+
+    def run_state(self, key, default=None):
+        return (self.get(RUN_STATE_FILENAME) or {}).get(key, default)
+
+    def set_run_state(self, key, value):
+        state = dict(self.get(RUN_STATE_FILENAME) or {})
+        state[key] = value
+        self.set(RUN_STATE_FILENAME, state)
+
+state_store = GistStateStore()
 
 def load_coords_cache():
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GIST_TOKEN}"}
-    response = requests.get(url, headers=headers)
+    return state_store.coords()
 
-    if response.status_code != 200:
-        print(f"❌ Failed to fetch gist: {response.status_code}")
-        return {}
+def save_coords_cache(data):
+    state_store.set_coords(data)
+
+class CoordsCache:
+    """City -> coordinates, loaded once per process.
+
+    Lookups are served from memory. The in-memory map is seeded from a local
+    file (while younger than the TTL) and otherwise from the Gist. New
+    entries are collected and written back to the Gist in one PATCH by
+    flush().
+    """
 
-    gist_data = response.json()
-    files = gist_data.get("files", {})
+    def __init__(self, path=os.path.join(CACHE_DIR, GIST_FILENAME), ttl=COORDS_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.coords = None
+        self.pending = {}
+        self.from_gist = False
 
-    if GIST_FILENAME in files:
+    def _load_local(self):
         try:
-            return json.loads(files[GIST_FILENAME]["content"])
-        except json.JSONDecodeError:
-            print("⚠️ Cache file exists but is not valid JSON — resetting.")
-            return {}
-    else:
-        # Create empty file in Gist
-        print(f"📄 Cache file '{GIST_FILENAME}' not found in Gist — creating it.")
-        save_coords_cache({})
-        return {}
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - data.get("saved_at", 0) > self.ttl:
+            return None
+        return data.get("coords", {})
 
-def save_coords_cache(data):
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GIST_TOKEN}"}
-    payload = {
-        "files": {
-            GIST_FILENAME: {
-                "content": json.dumps(data, indent=2)
-            }
-        }
-    }
-    response = requests.patch(url, headers=headers, json=payload)
-    if response.status_code == 200:
-        print("✅ Cache saved to Gist")
-    else:
-        print(f"❌ Failed to save cache: {response.status_code}")
+    def _save_local(self):
+        try:
+            dump_json_atomic({"saved_at": time.time(), "coords": self.coords}, self.path, separators=(",", ":"))
+        except OSError as e:
+            print("⚠️ Could not write local coords cache:", e)
+
+    def _load(self):
+        if self.coords is not None:
+            return
+        self.coords = self._load_local()
+        if self.coords is None:
+            self.coords = load_coords_cache()
+            self.from_gist = True
+            self._save_local()
+
+    def get(self, city):
+        self._load()
+        entry = self.coords.get(city)
+        if entry:
+            return entry["lat"], entry["lon"]
+        return None
+
+    def put(self, city, lat, lon):
+        self._load()
+        self.coords[city] = {"lat": lat, "lon": lon}
+        self.pending[city] = self.coords[city]
+
+    def flush(self):
+        if not self.pending:
+            return
+        if not self.from_gist:
+            # The local copy may be missing entries other runs added to the Gist
+            merged = load_coords_cache()
+            merged.update(self.coords)
+            self.coords = merged
+            self.from_gist = True
+        save_coords_cache(self.coords)
+        self._save_local()
+        self.pending.clear()
+
+coords_cache = CoordsCache()
 
 def get_coordinates(city):
-    cache = load_coords_cache()
-    if city in cache:
-        return cache[city]["lat"], cache[city]["lon"]
+    if city in CONFIG_COORDS:
+        return CONFIG_COORDS[city]
+    known = get_gazetteer().lookup(city)
+    if known:
+        return known
+    cached = coords_cache.get(city)
+    if cached:
+        return cached
 
     try:
         # Add `,IN` to improve accuracy
-        url = f"http://api.openweathermap.org/geo/1.0/direct?q={city},IN&limit=1&appid={OWM_API_KEY}"
-        response = requests.get(url, timeout=10)
+        url = f"{OWM_API_BASE}/geo/1.0/direct?q={city},IN&limit=1&appid={OWM_API_KEY}"
+        response = http_request("owm", "GET", url)
 
         if response.status_code != 200:
             print(f"❌ Failed to fetch coordinates for {city}: HTTP {response.status_code}")
             return None
 
-        data = response.json()
+        data = decode_json(response)
         if not isinstance(data, list) or not data:
             print(f"⚠️ No coordinates found for {city} – Response: {data}")
             return None
@@ -120,8 +741,7 @@ def get_coordinates(city):
             return None
 
         print(f"📍 {city} coords: {lat}, {lon}")
-        cache[city] = {"lat": lat, "lon": lon}
-        save_coords_cache(cache)
+        coords_cache.put(city, lat, lon)
         return lat, lon
 
     except Exception as e:
@@ -130,26 +750,159 @@ def get_coordinates(city):
         traceback.print_exc()
         return None
 
-def fetch_forecast(city):
-    coords = get_coordinates(city)
+RESPONSE_CACHE_FILE = os.path.join(CACHE_DIR, "responses.json")
+
+# Seconds a cached response is served without touching the network
+RESPONSE_TTLS = {
+    "owm/onecall": 4 * 3600,
+    "weatherbit/forecast": 3 * 3600,
+    "weatherapi/forecast": 6 * 3600,
+}
+RESPONSE_CACHE_MAX_AGE = 24 * 3600
+
+# Hours ahead that alerts look at; anything later is neither kept nor parsed
+ALERT_HORIZON_HOURS = 24
+# Hours a cached forecast must cover to last out RESPONSE_CACHE_MAX_AGE
+CACHED_HORIZON_HOURS = ALERT_HORIZON_HOURS + RESPONSE_CACHE_MAX_AGE // 3600
+
+def loads_json(content):
+    return orjson.loads(content) if orjson else json.loads(content)
+
+def decode_json(response):
+    return loads_json(response.content)
+
+class ResponseCache:
+    """Provider responses keyed by provider, endpoint and coordinates.
+
+    Persisted to RESPONSE_CACHE_FILE between runs. Entries keep the ETag /
+    Last-Modified validators so stale entries can be revalidated cheaply.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_FILE):
+        self.path = path
+        self.entries = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(provider, endpoint, coords):
+        return f"{provider}/{endpoint}@{coords[0]:.4f},{coords[1]:.4f}"
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                self.entries = loads_json(f.read())
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            self._load()
+            return self.entries.get(key)
+
+    def put(self, key, data, etag=None, last_modified=None):
+        with self.lock:
+            self._load()
+            self.entries[key] = {
+                "fetched_at": time.time(),
+                "etag": etag,
+                "last_modified": last_modified,
+                "data": data,
+            }
+            self.dirty = True
+
+    def cached_data(self, provider, endpoint, coords):
+        """Cached response data of any age up to RESPONSE_CACHE_MAX_AGE, or None."""
+        entry = self.get(self.key(provider, endpoint, coords))
+        if entry and time.time() - entry["fetched_at"] < RESPONSE_CACHE_MAX_AGE:
+            return entry["data"]
+        return None
+
+    def touch(self, key):
+        with self.lock:
+            self.entries[key]["fetched_at"] = time.time()
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            # Other processes may share the file; keep whichever copy is newer
+            try:
+                with open(self.path, "rb") as f:
+                    on_disk = loads_json(f.read())
+            except (OSError, ValueError):
+                on_disk = {}
+            for key, entry in on_disk.items():
+                if key not in self.entries or entry["fetched_at"] > self.entries[key]["fetched_at"]:
+                    self.entries[key] = entry
+            cutoff = time.time() - RESPONSE_CACHE_MAX_AGE
+            self.entries = {k: v for k, v in self.entries.items() if v["fetched_at"] >= cutoff}
+            try:
+                dump_json_atomic(self.entries, self.path, separators=(",", ":"))
+                self.dirty = False
+            except OSError as e:
+                print("⚠️ Could not write response cache:", e)
+
+response_cache = ResponseCache()
+
+def cached_get_json(provider, endpoint, coords, url, slim=None, max_age=None):
+    """GET a provider response through response_cache.
+
+    slim, if given, trims the decoded response to what the alert engine
+    reads before it is cached and returned. max_age overrides the
+    endpoint's TTL; 0 always goes to the network (conditionally, when
+    validators are cached). Returns None for any status but 200 or 304.
+    """
+    key = ResponseCache.key(provider, endpoint, coords)
+    entry = response_cache.get(key)
+    if max_age is None:
+        max_age = RESPONSE_TTLS.get(f"{provider}/{endpoint}", 0)
+    if entry and time.time() - entry["fetched_at"] < max_age:
+        return entry["data"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    refresh_scheduler.record_call(provider)
+    response = http_request(provider, "GET", url, headers=headers)
+    if response.status_code == 304 and entry:
+        response_cache.touch(key)
+        return entry["data"]
+    if response.status_code != 200:
+        print(f"⚠️ {provider} {endpoint} returned HTTP {response.status_code}")
+        return None
+
+    data = decode_json(response)
+    if slim:
+        # Deferred cells are served at any age up to RESPONSE_CACHE_MAX_AGE
+        data = slim(data, RESPONSE_CACHE_MAX_AGE)
+    response_cache.put(key, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return data
+
+def fetch_forecast(city, coords=None, max_age=None):
+    coords = coords or get_coordinates(city)
     if not coords:
         return None
     try:
         url = BASE_FORECAST_URL.format(*coords, OWM_API_KEY)
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        if "hourly" in data:
+        data = cached_get_json("owm", "onecall", coords, url, slim_owm, max_age)
+        if data and "hourly" in data:
             print(f"✅ Forecast fetched for {city}")
-        return data
+            return data
     except Exception as e:
         print(f"❌ Error fetching forecast for {city}:", e)
-        return None
+    return None
 
 def fetch_current_weather(city):
     try:
         url = BASE_CURRENT_URL.format(city, OWM_API_KEY)
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        response = http_request("owm", "GET", url)
+        data = decode_json(response)
         if response.status_code == 200 and "weather" in data:
             print(f"✅ Current weather fetched for {city}")
             return data
@@ -159,12 +912,14 @@ def fetch_current_weather(city):
         print(f"❌ Error fetching current weather for {city}:", e)
         return None
 
-def fetch_weatherbit_forecast(city):
+def fetch_weatherbit_forecast(city, coords=None, max_age=None):
+    coords = coords or get_coordinates(city)
+    if not coords:
+        return None
     try:
-        url = f"https://api.weatherbit.io/v2.0/forecast/hourly?city={city}&key={os.getenv('WEATHERBIT_API_KEY')}&hours=24"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        if "data" in data:
+        url = f"{WEATHERBIT_API_BASE}/v2.0/forecast/hourly?lat={coords[0]}&lon={coords[1]}&key={os.getenv('WEATHERBIT_API_KEY')}&hours={CACHED_HORIZON_HOURS}"
+        data = cached_get_json("weatherbit", "forecast", coords, url, slim_weatherbit, max_age)
+        if data and "data" in data:
             print(f"✅ Weatherbit forecast for {city}")
             return data
     except Exception as e:
@@ -173,9 +928,9 @@ def fetch_weatherbit_forecast(city):
 
 def fetch_weatherbit_current(city):
     try:
-        url = f"https://api.weatherbit.io/v2.0/current?city={city}&key={os.getenv('WEATHERBIT_API_KEY')}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        url = f"{WEATHERBIT_API_BASE}/v2.0/current?city={city}&key={os.getenv('WEATHERBIT_API_KEY')}"
+        response = http_request("weatherbit", "GET", url)
+        data = decode_json(response)
         if "data" in data:
             print(f"✅ Weatherbit current weather for {city}")
             return data["data"][0]
@@ -183,12 +938,14 @@ def fetch_weatherbit_current(city):
         print(f"❌ Weatherbit current error for {city}:", e)
     return None
 
-def fetch_weatherapi_forecast(city):
+def fetch_weatherapi_forecast(city, coords=None, max_age=None):
+    coords = coords or get_coordinates(city)
+    if not coords:
+        return None
     try:
-        url = f"http://api.weatherapi.com/v1/forecast.json?key={os.getenv('WEATHERAPI_KEY')}&q={city}&hours=24"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        if "forecast" in data:
+        url = f"{WEATHERAPI_API_BASE}/v1/forecast.json?key={os.getenv('WEATHERAPI_KEY')}&q={coords[0]},{coords[1]}&days=1&aqi=no&alerts=no"
+        data = cached_get_json("weatherapi", "forecast", coords, url, slim_weatherapi, max_age)
+        if data and "forecast" in data:
             print(f"✅ WeatherAPI forecast for {city}")
             return data
     except Exception as e:
@@ -197,9 +954,9 @@ def fetch_weatherapi_forecast(city):
 
 def fetch_weatherapi_current(city):
     try:
-        url = f"http://api.weatherapi.com/v1/current.json?key={os.getenv('WEATHERAPI_KEY')}&q={city}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        url = f"{WEATHERAPI_API_BASE}/v1/current.json?key={os.getenv('WEATHERAPI_KEY')}&q={city}"
+        response = http_request("weatherapi", "GET", url)
+        data = decode_json(response)
         if "current" in data:
             print(f"✅ WeatherAPI current weather for {city}")
             return data
@@ -207,15 +964,568 @@ def fetch_weatherapi_current(city):
         print(f"❌ WeatherAPI current error for {city}:", e)
     return None
 
-def fetch_all_forecasts(city):
-    owm = fetch_forecast(city)
-    wb = fetch_weatherbit_forecast(city)
-    wa = fetch_weatherapi_forecast(city)
-    return {
-        "owm": owm,
-        "weatherbit": wb,
-        "weatherapi": wa
+RAIN_KEYWORDS = ("rain", "shower", "drizzle", "thunderstorm", "storm")
+
+def looks_like_rain(desc: str) -> bool:
+    desc = desc.lower()
+    return any(word in desc for word in RAIN_KEYWORDS)
+
+class HourlyRecord:
+    """One forecast hour, identical for every provider.
+
+    pop is a 0–1 probability and precip is in mm. rainy is set when the
+    provider's condition text reads like rain.
+    """
+    __slots__ = ("ts", "temp", "pop", "precip", "rainy")
+
+    def __init__(self, ts, temp, pop=0.0, precip=0.0, rainy=False):
+        self.ts = ts
+        self.temp = temp
+        self.pop = pop
+        self.precip = precip
+        self.rainy = rainy
+
+class NormalizedForecast:
+    __slots__ = ("source", "hours", "daily_rain")
+
+    def __init__(self, source, hours, daily_rain=False):
+        self.source = source
+        self.hours = hours
+        self.daily_rain = daily_rain
+
+def parse_local_time(text, fmt="%Y-%m-%dT%H:%M:%S"):
+    return pytz.timezone("Asia/Kolkata").localize(datetime.strptime(text, fmt)).timestamp()
+
+def horizon_cutoff(extra=0):
+    return time.time() + ALERT_HORIZON_HOURS * 3600 + extra
+
+# Slimmers keep each response's shape but drop the fields and hours the
+# alert engine never reads. max_age widens the horizon so hours that come
+# into range while the response may still be served from the cache are kept.
+def slim_owm(data, max_age=0):
+    cutoff = horizon_cutoff(max_age)
+    hourly = []
+    for hour in data.get("hourly", []):
+        if hour["dt"] > cutoff:
+            break
+        slim = {"dt": hour["dt"], "temp": hour["temp"], "pop": hour.get("pop", 0),
+                "weather": [{"description": hour["weather"][0]["description"]}]}
+        if "rain" in hour:
+            slim["rain"] = {"1h": hour["rain"].get("1h", 0)}
+        hourly.append(slim)
+    return {"hourly": hourly}
+
+def slim_weatherbit(data, max_age=0):
+    if "data" not in data:
+        return data
+    return {"data": [
+        {"ts": hour.get("ts") or parse_local_time(hour["timestamp_local"]), "temp": hour["temp"],
+         "pop": hour.get("pop", 0), "precip": hour.get("precip") or 0,
+         "weather": {"description": hour["weather"]["description"]}}
+        for hour in data["data"]
+    ]}
+
+def slim_weatherapi(data, max_age=0):
+    if "forecast" not in data:
+        return data
+    forecastday = data["forecast"]["forecastday"][0]
+    day = forecastday["day"]
+    return {"forecast": {"forecastday": [{
+        "day": {"daily_will_it_rain": day.get("daily_will_it_rain"), "totalprecip_mm": day.get("totalprecip_mm", 0)},
+        "hour": [
+            {"time_epoch": hour.get("time_epoch") or parse_local_time(hour["time"], "%Y-%m-%d %H:%M"),
+             "temp_c": hour["temp_c"], "precip_mm": hour.get("precip_mm", 0),
+             "condition": {"text": hour["condition"]["text"]}}
+            for hour in forecastday["hour"]
+        ],
+    }]}}
+
+def normalize_owm(data):
+    cutoff = horizon_cutoff()
+    hours = []
+    for hour in data.get("hourly", []):
+        if hour["dt"] > cutoff:
+            break
+        hours.append(HourlyRecord(
+            hour["dt"],
+            hour["temp"],
+            hour.get("pop", 0),
+            hour.get("rain", {}).get("1h", 0),
+            looks_like_rain(hour["weather"][0]["description"]),
+        ))
+    return NormalizedForecast("owm", hours)
+
+def normalize_weatherbit(data):
+    cutoff = horizon_cutoff()
+    hours = []
+    for hour in data["data"]:
+        ts = hour.get("ts") or parse_local_time(hour["timestamp_local"])
+        if ts > cutoff:
+            break
+        hours.append(HourlyRecord(
+            ts,
+            hour["temp"],
+            hour.get("pop", 0) / 100,
+            hour.get("precip") or 0,
+            looks_like_rain(hour["weather"]["description"]),
+        ))
+    return NormalizedForecast("weatherbit", hours)
+
+def normalize_weatherapi(data):
+    forecastday = data["forecast"]["forecastday"][0]
+    day = forecastday["day"]
+    daily_rain = day.get("daily_will_it_rain") == 1 or day.get("totalprecip_mm", 0) > 0
+    cutoff = horizon_cutoff()
+    hours = []
+    for hour in forecastday["hour"]:
+        ts = hour.get("time_epoch") or parse_local_time(hour["time"], "%Y-%m-%d %H:%M")
+        if ts > cutoff:
+            break
+        hours.append(HourlyRecord(
+            ts,
+            hour["temp_c"],
+            0.0,
+            hour.get("precip_mm", 0),
+            looks_like_rain(hour["condition"]["text"]),
+        ))
+    return NormalizedForecast("weatherapi", hours, daily_rain)
+
+NORMALIZERS = {
+    "owm": normalize_owm,
+    "weatherbit": normalize_weatherbit,
+    "weatherapi": normalize_weatherapi,
+}
+
+def normalize_forecast(source, data):
+    """Convert a raw provider response into a NormalizedForecast (or None).
+
+    A response without a single forecast hour counts as no forecast.
+    """
+    if not data:
+        return None
+    try:
+        forecast = NORMALIZERS[source](data)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"⚠️ {source} parsing error:", e)
+        return None
+    if not forecast.hours:
+        print(f"⚠️ {source} response has no forecast hours")
+        return None
+    return forecast
+
+PROVIDER_FETCHERS = {
+    "owm": fetch_forecast,
+    "weatherbit": fetch_weatherbit_forecast,
+    "weatherapi": fetch_weatherapi_forecast,
+}
+
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", 60))
+# Seconds a city waits for its other providers once the first one has answered,
+# then goes ahead with whichever answered in time; also bounds each request's retries
+CITY_FETCH_DEADLINE = float(os.getenv("CITY_FETCH_DEADLINE", 12))
+
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", 3))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", 3 * 3600))
+
+class CircuitBreaker:
+    """Stops calling a provider after BREAKER_THRESHOLD consecutive failures.
+
+    An open breaker rejects calls for the cooldown, which outlasts a single
+    run and so carries across daemon runs. It then lets a single trial
+    request through: success closes it again and failure re-opens it.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self.trial:
+                return False
+            self.trial = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                self.trial = False
+                print(f"🚫 Circuit open for {self.name} after {self.failures} consecutive failures")
+
+    def abandon_trial(self):
+        """Forget a trial request whose result will never be recorded, so a later one can run."""
+        with self.lock:
+            self.trial = False
+
+circuit_breakers = {provider: CircuitBreaker(provider) for provider in PROVIDER_FETCHERS}
+
+# Returned by fetch workers when a provider's breaker rejected the call
+BREAKER_OPEN = object()
+# Returned for (cell, provider) pairs the refresh plan left to the cache
+DEFERRED = object()
+# Returned for requests whose cell already went ahead without them
+LATE = object()
+
+# Grid step in degrees (~11 km at 0.1); 0 disables snapping
+FETCH_GRID_DEG = float(os.getenv("FETCH_GRID_DEG", 0.1))
+
+def snap_to_grid(coords, step=FETCH_GRID_DEG):
+    lat, lon = coords
+    if step:
+        lat, lon = round(lat / step) * step, round(lon / step) * step
+    return round(lat, 4), round(lon, 4)
+
+def build_fetch_plan(*zone_sets, step=FETCH_GRID_DEG):
+    """Resolve every configured city and group them by grid cell.
+
+    Returns {cell_coords: [city, ...]}, so each cell is fetched once no matter
+    how many zones or zone sets reference the cities inside it.
+    """
+    plan = {}
+    seen = set()
+    for zones in zone_sets:
+        for cities in zones.values():
+            for city in cities:
+                if city in seen:
+                    continue
+                seen.add(city)
+                coords = get_coordinates(city)
+                if not coords:
+                    continue
+                plan.setdefault(snap_to_grid(coords, step), []).append(city)
+    print(f"🗺️ Fetch plan: {len(seen)} locations in {len(plan)} grid cells")
+    return plan
+
+def iter_fetch_plan(plan, deadline=FETCH_DEADLINE, refresh=None):
+    """Fetch every (cell, provider) pair concurrently, yielding cells as they complete.
+
+    Yields (cell, {provider: NormalizedForecast or None}) as soon as all of a
+    cell's providers have answered, failed or been skipped. Responses are
+    normalized on arrival and the raw JSON is dropped. Once a cell's first
+    provider answers from the network, the rest get CITY_FETCH_DEADLINE to
+    follow before the cell goes ahead without them. Providers whose circuit
+    breaker is open are skipped. Cells still waiting at the overall deadline
+    are yielded with whatever arrived in time.
+
+    refresh, from RefreshScheduler.plan(), is {provider: cells}: those
+    cells are fetched regardless of TTL and every other cell is served from
+    response_cache, however old, without touching the network.
+    """
+    results = {cell: {provider: None for provider in PROVIDER_FETCHERS} for cell in plan}
+    outstanding = {cell: len(PROVIDER_FETCHERS) for cell in plan}
+    # One pool per provider, sized to its concurrency, so a slow provider only
+    # ties up its own threads and never delays another provider's requests
+    pools = {p: ThreadPoolExecutor(max_workers=PROVIDER_CONCURRENCY.get(p, 4)) for p in PROVIDER_FETCHERS}
+    first_answer = {}
+    went_ahead = set()
+
+    def fetched(provider, cell):
+        return refresh is None or cell in refresh[provider]
+
+    def run(provider, cell):
+        limiter = rate_limiters.get(provider)
+        if limiter:
+            # Wait for the rate limit here, so a city that went ahead meanwhile sends nothing
+            limiter.acquire()
+        if cell in went_ahead:
+            return LATE
+        # Checked after queueing so a breaker that opened meanwhile applies
+        if not circuit_breakers[provider].allow():
+            return BREAKER_OPEN
+        with span("fetch", provider=provider, city=plan[cell][0]), request_deadline(CITY_FETCH_DEADLINE), \
+                prepaid_token(provider):
+            max_age = 0 if refresh is not None else None
+            return PROVIDER_FETCHERS[provider](plan[cell][0], coords=cell, max_age=max_age)
+
+    def submit(provider, cell):
+        if fetched(provider, cell):
+            return pools[provider].submit(run, provider, cell)
+        # Served from the cache straight away, without taking a thread
+        future = Future()
+        future.set_result(response_cache.cached_data(provider, FORECAST_ENDPOINTS[provider], cell) or DEFERRED)
+        return future
+
+    futures = {
+        submit(provider, cell): (cell, provider)
+        for cell in plan
+        for provider in PROVIDER_FETCHERS
     }
+    pending = set(futures)
+    stop_at = time.monotonic() + deadline
+    skipped = defaultdict(int)
+    deferred = defaultdict(int)
+    late = defaultdict(int)
+    try:
+        # Stop as soon as every cell has gone out; stragglers are left to the pool
+        while pending and results:
+            now = time.monotonic()
+            if now >= stop_at:
+                print(f"⏱️ Fetch deadline of {deadline}s hit – {len(pending)} requests dropped")
+                break
+            wake = min([stop_at] + [t + CITY_FETCH_DEADLINE for t in first_answer.values()])
+            done, pending = wait(pending, timeout=max(0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                cell, provider = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"❌ {provider} fetch failed for {plan[cell][0]}:", e)
+                    data = None
+                if data is LATE:
+                    late[provider] += 1
+                    continue
+                if data is BREAKER_OPEN:
+                    skipped[provider] += 1
+                    forecast = None
+                elif data is DEFERRED:
+                    deferred[provider] += 1
+                    forecast = None
+                else:
+                    forecast = normalize_forecast(provider, data)
+                    if not fetched(provider, cell):
+                        pass  # served from cache; says nothing about the provider
+                    elif forecast is None:
+                        circuit_breakers[provider].record_failure()
+                    else:
+                        circuit_breakers[provider].record_success()
+                        if cell in results:
+                            first_answer.setdefault(cell, time.monotonic())
+                if cell in went_ahead:
+                    late[provider] += 1
+                    continue
+                results[cell][provider] = forecast
+                outstanding[cell] -= 1
+                if not outstanding[cell]:
+                    first_answer.pop(cell, None)
+                    yield cell, results.pop(cell)
+            now = time.monotonic()
+            for cell, answered_at in list(first_answer.items()):
+                if now - answered_at >= CITY_FETCH_DEADLINE:
+                    del first_answer[cell]
+                    went_ahead.add(cell)
+                    yield cell, results.pop(cell)
+        for cell in list(results):
+            yield cell, results.pop(cell)
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        # A trial still unrecorded here was dropped at the deadline
+        for breaker in circuit_breakers.values():
+            breaker.abandon_trial()
+        for provider, count in skipped.items():
+            print(f"🚫 Skipped {count} {provider} requests – circuit open")
+        for provider, count in deferred.items():
+            print(f"💤 No {provider} data for {count} cells – deferred with nothing cached")
+        for provider, count in late.items():
+            print(f"⏱️ Dropped {count} {provider} requests – their city went ahead after {CITY_FETCH_DEADLINE}s")
+        run_report.info["circuit_breakers"] = {p: b.state for p, b in circuit_breakers.items()}
+
+# Forecast endpoint per provider, as used in response_cache keys
+FORECAST_ENDPOINTS = {"owm": "onecall", "weatherbit": "forecast", "weatherapi": "forecast"}
+
+# Free-tier forecast calls per UTC day; 0 means unmetered
+PROVIDER_DAILY_QUOTAS = {
+    "owm": int(os.getenv("OWM_DAILY_QUOTA", 1000)),
+    "weatherbit": int(os.getenv("WEATHERBIT_DAILY_QUOTA", 50)),
+    "weatherapi": int(os.getenv("WEATHERAPI_DAILY_QUOTA", 30000)),
+}
+REFRESH_LEDGER_FILE = os.path.join(CACHE_DIR, "refresh_ledger.json")
+RUN_INTERVAL_MINUTES = int(os.getenv("RUN_INTERVAL_MINUTES", os.getenv("DAEMON_INTERVAL_MINUTES", 180)))
+URGENT_LEAD_HOURS = 6       # an event this close gets refreshed every URGENT_REFRESH
+URGENT_REFRESH = 3600
+STABLE_STRETCH = 3.0        # a cell that never changes waits this many TTLs
+VOLATILITY_DECAY = 0.7
+
+def cell_key(cell):
+    return f"{cell[0]:.4f},{cell[1]:.4f}"
+
+def popcount(n):
+    return bin(n).count("1")
+
+class RefreshScheduler:
+    """Decides which (cell, provider) pairs a run fetches.
+
+    Each cell keeps the hours its alerts fired at its last refresh and a
+    volatility score: a moving average of how much those hours moved from
+    one refresh to the next. A cell with an event within URGENT_LEAD_HOURS
+    is due every URGENT_REFRESH; otherwise it is due after its provider's
+    TTL, stretched up to STABLE_STRETCH times for cells that never change.
+    Due pairs are fetched most overdue first, up to the provider's share of
+    its remaining daily quota; everything else is served from the response
+    cache. Calls made and cell history live in the run_state Gist file; the
+    calls are also kept in REFRESH_LEDGER_FILE, since dry runs never write
+    the Gist but still spend quota.
+
+    A cache_only scheduler fetches nothing and keeps no ledger; region
+    workers use one, since their parent already fetched under its quota.
+    interval_minutes is how often runs happen; run_daemon() sets it.
+    """
+
+    def __init__(self, cache_only=False, interval_minutes=RUN_INTERVAL_MINUTES):
+        self.cache_only = cache_only
+        self.interval_minutes = interval_minutes
+        self.state = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.state is not None:
+            return
+        state = state_store.run_state("refresh", None) or {}
+        self.state = {
+            "day": state.get("day"),
+            "calls": state.get("calls", {}),
+            "cells": state.get("cells", {}),
+        }
+        local = self._load_ledger()
+        if local.get("day") == self.state["day"]:
+            calls = self.state["calls"]
+            for provider, count in local.get("calls", {}).items():
+                calls[provider] = max(calls.get(provider, 0), count)
+        elif self.state["day"] is None:
+            self.state["day"] = local.get("day")
+            self.state["calls"] = local.get("calls", {})
+        self._roll_day()
+
+    def _load_ledger(self):
+        try:
+            with open(REFRESH_LEDGER_FILE) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _roll_day(self):
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        if self.state["day"] != today:
+            self.state["day"] = today
+            self.state["calls"] = {}
+
+    def record_call(self, provider):
+        with self.lock:
+            self._load()
+            self._roll_day()
+            calls = self.state["calls"]
+            calls[provider] = calls.get(provider, 0) + 1
+
+    def run_budget(self, provider):
+        """Calls this run may make: what is left today, spread over the runs left today."""
+        quota = PROVIDER_DAILY_QUOTAS.get(provider, 0)
+        if not quota:
+            return None
+        left = quota - self.state["calls"].get(provider, 0)
+        if left <= 0:
+            return 0
+        runs_left = math.ceil((86400 - time.time() % 86400) / (self.interval_minutes * 60))
+        return max(1, left // max(1, runs_left))
+
+    def refresh_interval(self, provider, cell, now=None):
+        now = time.time() if now is None else now
+        ttl = RESPONSE_TTLS.get(f"{provider}/{FORECAST_ENDPOINTS[provider]}", 0)
+        history = self.state["cells"].get(cell_key(cell))
+        if not history:
+            return ttl
+        lead = history.get("lead")
+        # lead was measured from base; the event has come that much closer since
+        if lead is not None and lead - (now - history["base"]) / 3600 < URGENT_LEAD_HOURS:
+            return min(ttl, URGENT_REFRESH)
+        stretch = STABLE_STRETCH - (STABLE_STRETCH - 0.5) * history.get("volatility", 0.0)
+        return min(ttl * stretch, RESPONSE_CACHE_MAX_AGE / 2)
+
+    def plan(self, cells):
+        """{provider: set of cells to fetch this run}, for iter_fetch_plan(refresh=...)."""
+        if self.cache_only:
+            print(f"🗓️ Serving all {len(cells)} cells from the prefetched cache")
+            return {provider: set() for provider in FORECAST_ENDPOINTS}
+        now = time.time()
+        with self.lock:
+            self._load()
+            self._roll_day()
+            refresh, stats = {}, {}
+            for provider, endpoint in FORECAST_ENDPOINTS.items():
+                due = []
+                for cell in cells:
+                    entry = response_cache.get(ResponseCache.key(provider, endpoint, cell))
+                    age = now - entry["fetched_at"] if entry else math.inf
+                    interval = self.refresh_interval(provider, cell, now)
+                    if age >= interval:
+                        due.append((age / interval if interval else math.inf, cell))
+                due.sort(key=lambda d: d[0], reverse=True)
+                budget = self.run_budget(provider)
+                chosen = due if budget is None else due[:budget]
+                refresh[provider] = {cell for _, cell in chosen}
+                stats[provider] = {"due": len(due), "fetch": len(chosen), "budget": budget,
+                                   "calls_today": self.state["calls"].get(provider, 0)}
+        run_report.info["refresh_plan"] = stats
+        for provider, s in stats.items():
+            print(f"🗓️ {provider}: fetching {s['fetch']}/{len(cells)} cells "
+                  f"({s['due']} due, budget {'∞' if s['budget'] is None else s['budget']})")
+        return refresh
+
+    def observe(self, cell, fired_hours, now=None):
+        """Record a refreshed cell's fired hours (from RuleSet.evaluate) and update its volatility."""
+        now = time.time() if now is None else now
+        base = math.ceil(now / 3600) * 3600
+        masks = list(fired_hours)
+        any_hours = 0
+        for mask in masks:
+            any_hours |= mask
+        lead = (any_hours & -any_hours).bit_length() - 1 if any_hours else None
+        with self.lock:
+            self._load()
+            key = cell_key(cell)
+            previous = self.state["cells"].get(key)
+            volatility = 0.0
+            if previous:
+                volatility = previous.get("volatility", 0.0)
+                shift = max(0, (base - previous["base"]) // 3600)
+                window = (1 << max(0, ALERT_HORIZON_HOURS - shift)) - 1
+                moved = union = 0
+                for old, new in zip(previous["hours"], masks):
+                    old = (old >> shift) & window
+                    new &= window
+                    moved += popcount(old ^ new)
+                    union += popcount(old | new)
+                change = moved / union if union else 0.0
+                volatility = VOLATILITY_DECAY * volatility + (1 - VOLATILITY_DECAY) * change
+            self.state["cells"][key] = {"base": base, "hours": masks, "lead": lead,
+                                        "volatility": round(volatility, 3)}
+
+    def save(self):
+        with self.lock:
+            if self.state is None or self.cache_only:
+                return
+            try:
+                dump_json_atomic({"day": self.state["day"], "calls": self.state["calls"]}, REFRESH_LEDGER_FILE)
+            except OSError as e:
+                print("⚠️ Could not write local refresh ledger:", e)
+            cutoff = math.ceil(time.time() / 3600) * 3600 - RESPONSE_CACHE_MAX_AGE
+            self.state["cells"] = {k: v for k, v in self.state["cells"].items() if v["base"] >= cutoff}
+            state_store.set_run_state("refresh", self.state)
+
+refresh_scheduler = RefreshScheduler()
 
 def summarize_current_weather(data):
     if not data:
@@ -225,187 +1535,536 @@ def summarize_current_weather(data):
     city = data["name"]
     return f"{city}: {desc}, {temp}°C"
 
+# IST hour -> time bucket, so bucketing is arithmetic instead of tz conversion
+IST_OFFSET = 5 * 3600 + 30 * 60
+HOUR_BUCKETS = (
+    ["midnight"] * 3 + ["early morning"] * 4 + ["morning"] * 4 + ["late morning"] * 2
+    + ["afternoon"] * 3 + ["late afternoon"] * 2 + ["evening"] * 3 + ["night"] * 3
+)
+
 def get_time_of_day(dt_unix):
-    hour = datetime.fromtimestamp(dt_unix, pytz.timezone("Asia/Kolkata")).hour
-    if 0 <= hour <= 2: return "midnight"
-    if 3 <= hour <= 6: return "early morning"
-    if 7 <= hour <= 10: return "morning"
-    if 11 <= hour <= 12: return "late morning"
-    if 13 <= hour <= 15: return "afternoon"
-    if 16 <= hour <= 17: return "late afternoon"
-    if 18 <= hour <= 20: return "evening"
-    return "night"
-
-def is_significant_forecast(forecasts):
-    now = datetime.now(pytz.timezone("Asia/Kolkata")).timestamp()
-    events = []
-
-    RAIN_KEYWORDS = ["rain", "shower", "drizzle", "thunderstorm", "storm"]
-
-    def looks_like_rain(desc: str) -> bool:
-        return any(word in desc for word in RAIN_KEYWORDS)
-
-    def check_event(condition, label, dt):
-        if condition:
-            events.append((label, get_time_of_day(dt), dt))
-
-    for source, forecast in forecasts.items():
-        if not forecast:
-            continue
+    return HOUR_BUCKETS[int((dt_unix + IST_OFFSET) // 3600) % 24]
 
-        if source == "owm":
-            for hour in forecast.get("hourly", []):
-                if hour["dt"] < now:
-                    continue
-                desc = hour["weather"][0]["description"].lower()
-                temp = hour["temp"]
-                pop = hour.get("pop", 0)
-                rain_mm = hour.get("rain", {}).get("1h", 0)
-
-                check_event(looks_like_rain(desc) or pop >= 0.1 or rain_mm > 0, "🌧️ Rain", hour["dt"])
-                check_event(temp >= 40, "🔥 Heat", hour["dt"])
-                check_event(temp <= 20, "❄️ Cold", hour["dt"])
-
-        elif source == "weatherbit":
-            for hour in forecast["data"]:
-                dt = datetime.fromisoformat(hour["timestamp_local"]).astimezone(pytz.timezone("Asia/Kolkata"))
-                if dt.timestamp() < now:
+ALERT_RULES_FILE = os.getenv(
+    "ALERT_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "alert_rules.json")
+)
+RULE_FIELDS = ("temp", "pop", "precip", "rainy")
+RULE_OPS = {">=": "greater_equal", ">": "greater", "<=": "less_equal", "<": "less", "==": "equal"}
+EVAL_BATCH = int(os.getenv("EVAL_BATCH", "256"))
+
+class AlertRule:
+    __slots__ = ("label", "combine", "conditions", "daily_rain", "min_weight", "min_providers")
+
+    def __init__(self, config):
+        self.label = config["label"]
+        self.combine = "any" if "any" in config else "all"
+        self.conditions = []
+        for field, op, value in config[self.combine]:
+            if field not in RULE_FIELDS or op not in RULE_OPS:
+                raise ValueError(f"Bad condition in rule {self.label!r}: {field} {op} {value}")
+            self.conditions.append((RULE_FIELDS.index(field), RULE_OPS[op], float(value)))
+        self.daily_rain = bool(config.get("daily_rain", False))
+        self.min_weight = float(config.get("min_weight", 1))
+        self.min_providers = int(config.get("min_providers", 1))
+
+class RuleSet:
+    """Alert rules from alert_rules.json, evaluated over a whole batch of locations at once.
+
+    Forecasts are stacked into a locations x hours x providers x fields array.
+    Column 0 stands for "now" and only carries daily rain flags, and column
+    h + 1 is the h-th full hour from now. A rule fires at a location and hour
+    when the providers matching it reach min_weight and min_providers.
+    """
+
+    def __init__(self, config):
+        self.providers = list(config["providers"])
+        self.weights = [float(config["providers"][p]) for p in self.providers]
+        self.rules = [AlertRule(rule) for rule in config["rules"]]
+
+    @classmethod
+    def load(cls, path=ALERT_RULES_FILE):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def stack(self, batch, now):
+        import numpy as np
+
+        start = math.ceil(now / 3600) * 3600
+        index, rows, daily = [], [], np.zeros((len(batch), len(self.providers)), dtype=bool)
+        for i, forecasts in enumerate(batch):
+            for p, provider in enumerate(self.providers):
+                forecast = forecasts.get(provider)
+                if not forecast:
                     continue
-                desc = hour["weather"]["description"].lower()
-                temp = hour["temp"]
-                pop = hour.get("pop", 0)
-                precip_mm = hour.get("precip", 0)
-
-                check_event(looks_like_rain(desc) or pop >= 10 or precip_mm > 0, "🌧️ Rain", dt.timestamp())
-                check_event(temp >= 40, "🔥 Heat", dt.timestamp())
-                check_event(temp <= 20, "❄️ Cold", dt.timestamp())
-
-        elif source == "weatherapi":
-            try:
-                # Check daily summary first
-                day = forecast["forecast"]["forecastday"][0]["day"]
-                if day.get("daily_will_it_rain") == 1 or day.get("totalprecip_mm", 0) > 0:
-                    check_event(True, "🌧️ Rain", datetime.now(pytz.timezone("Asia/Kolkata")).timestamp())
-        
-                # Then check hourlies
-                hours = forecast["forecast"]["forecastday"][0]["hour"]
-                for hour in hours:
-                    dt = datetime.strptime(hour["time"], "%Y-%m-%d %H:%M").astimezone(pytz.timezone("Asia/Kolkata"))
-                    if dt.timestamp() < now:
-                        continue
-                    desc = hour["condition"]["text"].lower()
-                    temp = hour["temp_c"]
-                    precip_mm = hour.get("precip_mm", 0)
-        
-                    check_event(looks_like_rain(desc) or precip_mm > 0, "🌧️ Rain", dt.timestamp())
-                    check_event(temp >= 40, "🔥 Heat", dt.timestamp())
-                    check_event(temp <= 20, "❄️ Cold", dt.timestamp())
-            except Exception as e:
-                print("⚠️ WeatherAPI parsing error:", e)
-                continue
-
-    # sort events by actual timestamp
-    events.sort(key=lambda x: x[2])
-
-    # merge continuous events
-    merged = []
-    if events:
-        prev_label, prev_bucket, prev_dt = events[0]
-        start_bucket = prev_bucket
-        end_bucket = prev_bucket
-        merged.append((prev_label, start_bucket, end_bucket))
-
-        for label, bucket, dt in events[1:]:
-            if label == prev_label:
-                merged[-1] = (label, start_bucket, bucket)  # extend range
-                end_bucket = bucket
-            else:
-                start_bucket = bucket
-                end_bucket = bucket
-                merged.append((label, start_bucket, end_bucket))
-
-    # 🔹 filter out alerts that are already "expired"
-    current_bucket = get_time_of_day(now)
-    current_index = TIME_BUCKETS.index(current_bucket)
-    valid_alerts = []
-    for label, start, end in merged:
-        end_index = TIME_BUCKETS.index(end)
-        if end_index >= current_index:  # still relevant
-            if start == end:
-                valid_alerts.append(f"{label} in {start}")
-            else:
-                valid_alerts.append(f"{label} from {start} to {end}")
-
-    return valid_alerts
-    
-def prepare_zone_alerts(zones):
-    zone_alerts = {}
-    for zone, cities in zones.items():
-        all_alerts = []
-        for city in cities:
-            forecast = fetch_all_forecasts(city)
-            if not forecast:
+                daily[i, p] = forecast.daily_rain
+                for hour in forecast.hours:
+                    if hour.ts >= now:
+                        index.append((i, 1 + int((hour.ts - start) // 3600), p))
+                        rows.append((hour.temp, hour.pop, hour.precip, hour.rainy))
+
+        columns = 1 + max((h for _, h, _ in index), default=0)
+        values = np.full((len(batch), columns, len(self.providers), len(RULE_FIELDS)), np.nan, dtype=np.float32)
+        if index:
+            i, h, p = np.array(index).T
+            values[i, h, p] = np.array(rows, dtype=np.float32)
+        return values, daily
+
+    def match(self, rule, values, daily):
+        import numpy as np
+
+        combine = np.logical_or if rule.combine == "any" else np.logical_and
+        hits = None
+        for field, op, value in rule.conditions:
+            test = getattr(np, op)(values[..., field], value)
+            hits = test if hits is None else combine(hits, test, out=hits)
+        if rule.daily_rain:
+            hits[:, 0, :] |= daily
+        return hits
+
+    def evaluate(self, batch, now=None, fired_hours=None):
+        """Evaluate a list of {provider: NormalizedForecast} dicts in one pass.
+
+        Returns one (alerts, sources) pair per entry, where sources maps each
+        alert to the set of providers that matched it. If a fired_hours list
+        is passed, it is extended with one tuple per entry holding a bitmask
+        per rule of the hours it fired, bit 0 being the first full hour.
+        """
+        now = time.time() if now is None else now
+        return self.evaluate_arrays(*self.stack(batch, now), now, fired_hours)
+
+    def fired(self, rule, values, daily):
+        """(hits, fired): per-provider matches and the location x column mask where the rule fires."""
+        import numpy as np
+
+        hits = self.match(rule, values, daily)
+        # Summed weights and provider count from one matrix product
+        totals = hits @ np.array([self.weights, [1.0] * len(self.weights)], dtype=np.float32).T
+        return hits, (totals[..., 0] >= rule.min_weight) & (totals[..., 1] >= rule.min_providers)
+
+    @staticmethod
+    def spans(fired):
+        """(rows, rules, firsts, lasts): each rule's first and last firing column per location.
+
+        fired is locations x columns x rules. A rule gives one span however
+        often it stops and starts again in between; spans come in order of
+        location, first column, then rule.
+        """
+        import numpy as np
+
+        rows, rules = np.nonzero(fired.any(axis=1))
+        firsts = fired.argmax(axis=1)[rows, rules]
+        lasts = fired.shape[1] - 1 - fired[:, ::-1].argmax(axis=1)[rows, rules]
+        order = np.lexsort((rules, firsts, rows))
+        return rows[order], rules[order], firsts[order], lasts[order]
+
+    @staticmethod
+    def time_buckets(columns, now):
+        """Time-of-day bucket names per column, their TIME_BUCKETS indexes and the index for now."""
+        import numpy as np
+
+        start = math.ceil(now / 3600) * 3600
+        times = [now] + [start + 3600 * h for h in range(columns - 1)]
+        buckets = [get_time_of_day(t) for t in times]
+        return buckets, np.array([TIME_BUCKETS.index(b) for b in buckets]), TIME_BUCKETS.index(get_time_of_day(now))
+
+    def count_alerts(self, values, daily, now):
+        """Alerts per rule that evaluate_arrays() would return, without building alert strings.
+
+        now may also be an array with one time per location row, so rows from
+        many runs can be counted in a single pass.
+        """
+        import numpy as np
+
+        now = np.broadcast_to(np.asarray(now, dtype=np.float64), (len(values),))
+        hour_buckets = np.array([TIME_BUCKETS.index(b) for b in HOUR_BUCKETS])
+        first_hour = ((np.ceil(now / 3600) * 3600 + IST_OFFSET) // 3600).astype(np.int64)
+        bucket_index = np.empty((len(values), values.shape[1]), dtype=np.int64)
+        bucket_index[:, 0] = hour_buckets[((now + IST_OFFSET) // 3600).astype(np.int64) % 24]
+        bucket_index[:, 1:] = hour_buckets[(first_hour[:, None] + np.arange(values.shape[1] - 1)) % 24]
+
+        fired = np.stack([self.fired(rule, values, daily)[1] for rule in self.rules], axis=2)
+        rows, rules, _, lasts = self.spans(fired)
+        live = bucket_index[rows, lasts] >= bucket_index[rows, 0]
+        return np.bincount(rules[live], minlength=len(self.rules)).tolist()
+
+    def evaluate_arrays(self, values, daily, now, fired_hours=None):
+        """evaluate() on arrays already stacked as stack() lays them out."""
+        import numpy as np
+
+        buckets, bucket_index, current_index = self.time_buckets(values.shape[1], now)
+        # Contributing providers travel as a bitmask; this maps it back to names
+        provider_sets = [
+            {p for bit, p in enumerate(self.providers) if mask >> bit & 1}
+            for mask in range(1 << len(self.providers))
+        ]
+        provider_bits = 1 << np.arange(len(self.providers))
+
+        fired = np.zeros(values.shape[:2] + (len(self.rules),), dtype=bool)
+        # Per location and rule, the providers that matched where it fired
+        masks = np.zeros((len(values), len(self.rules)), dtype=np.int64)
+        hour_masks = []
+        for r, rule in enumerate(self.rules):
+            hits, fired[..., r] = self.fired(rule, values, daily)
+            masks[:, r] = (hits & fired[..., r, None]).any(axis=1) @ provider_bits
+            if fired_hours is not None:
+                hourly = fired[:, 1:64, r]
+                bits = np.uint64(1) << np.arange(hourly.shape[1], dtype=np.uint64)
+                hour_masks.append((hourly * bits).sum(axis=1, dtype=np.uint64).tolist())
+
+        # One "in ..." or "from ... to ..." alert per rule, from its first to its last firing
+        rows, rules, firsts, lasts = self.spans(fired)
+        live = bucket_index[lasts] >= current_index  # drop already "expired" alerts
+        rows, rules, firsts, lasts = rows[live], rules[live], firsts[live], lasts[live]
+        masks = masks[rows, rules]
+
+        results = [([], {}) for _ in range(len(values))]
+        for i, r, first, last, mask in zip(
+            rows.tolist(), rules.tolist(), firsts.tolist(), lasts.tolist(), masks.tolist()
+        ):
+            alerts, sources = results[i]
+            start, end = buckets[first], buckets[last]
+            label = self.rules[r].label
+            alert = f"{label} in {start}" if start == end else f"{label} from {start} to {end}"
+            alerts.append(alert)
+            sources[alert] = provider_sets[mask]
+        if fired_hours is not None:
+            fired_hours.extend(zip(*hour_masks) if hour_masks else [()] * len(values))
+        return results
+
+@lru_cache(maxsize=1)
+def get_rule_set():
+    return RuleSet.load()
+
+def is_significant_forecast(forecasts, sources=None):
+    """Return the city's alert strings.
+
+    If a sources dict is passed, it is filled with {alert: set of providers}
+    that contributed to each alert.
+    """
+    alerts, alert_sources = get_rule_set().evaluate([forecasts])[0]
+    if sources is not None:
+        sources.update(alert_sources)
+    return alerts
+
+class ZoneAggregator:
+    """Collects per-city alerts and closes each zone once all its cities report.
+
+    A closed zone's alerts are deduplicated in configured city order, so the
+    result matches a zone-by-zone pass no matter the order cities arrive in.
+    """
+
+    def __init__(self, zones):
+        self.zones = zones
+        self.city_zones = defaultdict(list)
+        for zone, cities in zones.items():
+            for city in cities:
+                self.city_zones[city].append(zone)
+        self.remaining = {zone: len(cities) for zone, cities in zones.items()}
+        self.reports = {zone: {} for zone in zones}
+        self.closed = {}
+        self.sources = {}
+
+    def add(self, city, alerts, sources=None):
+        for zone in self.city_zones.get(city, ()):
+            if city in self.reports.get(zone, ()):
                 continue
-            alerts = is_significant_forecast(forecast)
             print(f"🔍 {zone} / {city}: alerts={alerts}")
-            if alerts:
-                all_alerts.extend(alerts)
-                # no break here — collect from all cities in the zone
-
-        if all_alerts:
-            # deduplicate while preserving order
-            seen = set()
-            unique_alerts = []
-            for a in all_alerts:
-                if a not in seen:
-                    unique_alerts.append(a)
-                    seen.add(a)
-            zone_alerts[zone] = unique_alerts
-            print(f"✅ Zone alerts generated: {zone_alerts}")
-    return zone_alerts
+            self.reports[zone][city] = (alerts, sources or {})
+            self.remaining[zone] -= 1
+            if not self.remaining[zone]:
+                self._close(zone)
+
+    def _close(self, zone):
+        reports = self.reports.pop(zone)
+        unique_alerts = []
+        sources = {}
+        for city in self.zones[zone]:
+            alerts, city_sources = reports.get(city, ((), {}))
+            for alert in alerts:
+                if alert not in sources:
+                    unique_alerts.append(alert)
+                    sources[alert] = set()
+                sources[alert].update(city_sources.get(alert, ()))
+        if unique_alerts:
+            self.closed[zone] = unique_alerts
+            self.sources[zone] = {a: sorted(sources[a]) for a in unique_alerts}
+            print(f"✅ Zone alerts generated for {zone}: {unique_alerts}")
+
+    def finish(self):
+        """Close zones still waiting on cities that never reported; return zone alerts in config order."""
+        for zone in list(self.reports):
+            self._close(zone)
+        run_report.info.setdefault("alert_sources", {}).update(self.sources)
+        return {zone: self.closed[zone] for zone in self.zones if zone in self.closed}
+
+FORECAST_ARCHIVE_DIR = os.getenv("FORECAST_ARCHIVE_DIR", os.path.join(CACHE_DIR, "archive"))
+
+# table -> column -> dtype; each column is one raw file, <table>.<column>
+ARCHIVE_COLUMNS = {
+    "runs": {"time": "<f8", "first_forecast": "<u8"},
+    "forecasts": {"location": "<u4", "provider": "u1", "daily_rain": "u1", "first_hour": "<u8", "hours": "<u2"},
+    "hours": {"ts": "<u4", "temp": "<f4", "pop": "<f4", "precip": "<f4", "rainy": "u1"},
+}
 
-LAST_TWEET_FILENAME = "last_tweet.json"
+class ForecastArchive:
+    """Append-only columnar archive of every run's normalized forecasts.
 
-def load_last_tweet():
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GIST_TOKEN}"}
-    response = requests.get(url, headers=headers)
+    A run row points at its first forecast row, a forecast row (one grid
+    cell from one provider) at its first hour row. Columns are plain
+    little-endian arrays, so read() memory-maps them and a run is sliced
+    out without parsing anything. meta.json names the locations and
+    providers the integer ids refer to.
+    """
 
-    if response.status_code != 200:
-        print("⚠️ Couldn't fetch last tweet file")
-        return None
+    def __init__(self, path=FORECAST_ARCHIVE_DIR):
+        self.path = path
+        self.meta = None
+        self.lock = threading.Lock()
+
+    def _file(self, table, column):
+        return os.path.join(self.path, f"{table}.{column}")
 
-    gist_data = response.json()
-    files = gist_data.get("files", {})
-    if LAST_TWEET_FILENAME in files:
+    def _load_meta(self):
+        if self.meta is not None:
+            return
         try:
-            return json.loads(files[LAST_TWEET_FILENAME]["content"])
-        except Exception as e:
-            print("⚠️ Could not parse last tweet:", e)
-    return None
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {"locations": [], "providers": list(PROVIDER_FETCHERS)}
+        self.ids = {kind: {name: i for i, name in enumerate(self.meta[kind])} for kind in self.meta}
+
+    def _id(self, kind, name):
+        ids = self.ids[kind]
+        if name not in ids:
+            ids[name] = len(self.meta[kind])
+            self.meta[kind].append(name)
+        return ids[name]
+
+    def rows(self, table):
+        import numpy as np
+
+        column, dtype = next(iter(ARCHIVE_COLUMNS[table].items()))
+        try:
+            return os.path.getsize(self._file(table, column)) // np.dtype(dtype).itemsize
+        except OSError:
+            return 0
+
+    def _append(self, table, columns):
+        import numpy as np
+
+        os.makedirs(self.path, exist_ok=True)
+        for column, dtype in ARCHIVE_COLUMNS[table].items():
+            with open(self._file(table, column), "ab") as f:
+                f.write(np.asarray(columns[column], dtype=dtype).tobytes())
+
+    def begin_run(self, now):
+        with self.lock:
+            self._load_meta()
+            self._append("runs", {"time": [now], "first_forecast": [self.rows("forecasts")]})
+
+    def append(self, cells):
+        """Append [(cell, {provider: NormalizedForecast or None})] to the current run."""
+        with self.lock:
+            self._load_meta()
+            forecasts = {column: [] for column in ARCHIVE_COLUMNS["forecasts"]}
+            hours = {column: [] for column in ARCHIVE_COLUMNS["hours"]}
+            next_hour = self.rows("hours")
+            for cell, cell_forecasts in cells:
+                location = self._id("locations", f"{cell[0]:.4f},{cell[1]:.4f}")
+                for provider, forecast in cell_forecasts.items():
+                    if not forecast:
+                        continue
+                    forecasts["location"].append(location)
+                    forecasts["provider"].append(self._id("providers", provider))
+                    forecasts["daily_rain"].append(forecast.daily_rain)
+                    forecasts["first_hour"].append(next_hour)
+                    forecasts["hours"].append(len(forecast.hours))
+                    next_hour += len(forecast.hours)
+                    for hour in forecast.hours:
+                        hours["ts"].append(hour.ts)
+                        hours["temp"].append(hour.temp)
+                        hours["pop"].append(hour.pop)
+                        hours["precip"].append(hour.precip)
+                        hours["rainy"].append(hour.rainy)
+            self._append("hours", hours)
+            self._append("forecasts", forecasts)
+            dump_json_atomic(self.meta, os.path.join(self.path, "meta.json"), ensure_ascii=False)
+
+    def read(self):
+        """Memory-map every column: {table: {column: array}}, trimmed to whole rows."""
+        import numpy as np
+
+        self.meta = None
+        self._load_meta()
+        tables = {}
+        for table, columns in ARCHIVE_COLUMNS.items():
+            arrays = {}
+            for column, dtype in columns.items():
+                path = self._file(table, column)
+                if os.path.exists(path) and os.path.getsize(path):
+                    arrays[column] = np.memmap(path, dtype=dtype, mode="r").view(np.ndarray)
+                else:
+                    arrays[column] = np.empty(0, dtype=dtype)
+            rows = min(len(a) for a in arrays.values())
+            tables[table] = {column: a[:rows] for column, a in arrays.items()}
+        return tables
+
+    def run_arrays(self, tables, run, providers):
+        """One archived run laid out like RuleSet.stack() for the given providers.
+
+        Returns (location ids, values, daily, run time).
+        """
+        _, locations, values, daily, _ = self.runs_arrays(tables, run, run + 1, providers)
+        return locations, values, daily, float(tables["runs"]["time"][run])
+
+    def runs_arrays(self, tables, first, stop, providers):
+        """Runs first..stop-1 stacked into one batch, one row per (run, location).
+
+        Returns (run per row, location id per row, values, daily, run time
+        per row); columns are relative to each row's own run time.
+        """
+        import numpy as np
+
+        runs, forecasts, hours = tables["runs"], tables["forecasts"], tables["hours"]
+        total = len(forecasts["location"])
+        firsts = runs["first_forecast"][first:stop].astype(np.int64)
+        f0 = min(int(firsts[0]), total)
+        f1 = int(runs["first_forecast"][stop]) if stop < len(runs["time"]) else total
+        f1 = min(f1, total)
+
+        provider_map = np.array([providers.index(p) if p in providers else -1 for p in self.meta["providers"]])
+        run_of = first + np.searchsorted(firsts, np.arange(f0, f1), side="right") - 1
+        span_locations = int(forecasts["location"][f0:f1].max()) + 1 if f1 > f0 else 1
+        keys, local = np.unique(run_of * span_locations + forecasts["location"][f0:f1], return_inverse=True)
+        row_runs, locations = keys // span_locations, keys % span_locations
+        now = runs["time"][row_runs].astype(np.float64)
+        provider = provider_map[forecasts["provider"][f0:f1]]
+        known = provider >= 0
+        daily = np.zeros((len(keys), len(providers)), dtype=bool)
+        daily[local[known], provider[known]] = forecasts["daily_rain"][f0:f1][known].astype(bool)
+
+        counts = forecasts["hours"][f0:f1].astype(np.int64)
+        h0 = int(forecasts["first_hour"][f0]) if f1 > f0 else 0
+        h1 = min(h0 + int(counts.sum()), len(hours["ts"]))
+        row = np.repeat(local, counts)[:h1 - h0]
+        row_provider = np.repeat(provider, counts)[:h1 - h0]
+        ts = hours["ts"][h0:h1].astype(np.int64)
+        start = (np.ceil(now / 3600) * 3600).astype(np.int64)
+        keep = np.flatnonzero((ts >= now[row]) & (row_provider >= 0))
+        row, row_provider = row[keep], row_provider[keep]
+        column = 1 + (ts[keep] - start[row]) // 3600
+
+        width = 1 + int(column.max()) if len(keep) else 1
+        values = np.full((len(keys), width, len(providers), len(RULE_FIELDS)), np.nan, dtype=np.float32)
+        # One flat index per kept hour is much cheaper than indexing three axes
+        flat = (row * width + column) * len(providers) + row_provider
+        fields = np.empty((len(keep), len(RULE_FIELDS)), dtype=np.float32)
+        for i, field in enumerate(RULE_FIELDS):
+            fields[:, i] = hours[field][h0:h1][keep]
+        values.reshape(-1, len(RULE_FIELDS))[flat] = fields
+        return row_runs, locations, values, daily, now
+
+forecast_archive = ForecastArchive()
+
+def evaluate_cells(batch, fired_hours=None):
+    """Evaluate [(cities, forecasts)] in one vectorized pass; returns [(alerts, sources)]."""
+    if not batch:
+        return []
+    locations = sum(len(cities) for cities, _ in batch)
+    with span("evaluate", cells=len(batch), locations=locations):
+        return get_rule_set().evaluate([forecasts for _, forecasts in batch], fired_hours=fired_hours)
+
+def stream_zone_alerts(plan, zone_sets, deadline=FETCH_DEADLINE):
+    """Fetch, evaluate and aggregate as a pipeline.
+
+    Cells are evaluated in batches of EVAL_BATCH as their providers come in,
+    or sooner when a batch holds the last city of a zone so that zone closes
+    straight away. Their forecasts are dropped straight after, so memory
+    stays flat however many locations are configured. Returns one
+    {zone: alerts} dict per zone set.
+    """
+    aggregators = [ZoneAggregator(zones) for zones in zone_sets]
+    planned = {city for cities in plan.values() for city in cities}
+    for aggregator in aggregators:
+        for city in list(aggregator.city_zones):
+            if city not in planned:
+                aggregator.add(city, [])
+    # Cities per zone not yet fetched, to spot a batch that would close a zone
+    unfetched = [dict(aggregator.remaining) for aggregator in aggregators]
+
+    def closes_zone(cell):
+        closes = False
+        for left, aggregator in zip(unfetched, aggregators):
+            for city in plan[cell]:
+                for zone in aggregator.city_zones.get(city, ()):
+                    left[zone] -= 1
+                    closes = closes or not left[zone]
+        return closes
+
+    with span("schedule_refresh"):
+        refresh = refresh_scheduler.plan(list(plan))
+    refreshed = set().union(*refresh.values())
+
+    archive = forecast_archive if FORECAST_ARCHIVE_DIR else None
+    if archive:
+        try:
+            archive.begin_run(time.time())
+        except OSError as e:
+            print("⚠️ Could not append to forecast archive:", e)
+            archive = None
+    pending = []
+
+    def evaluate_pending():
+        batch = [(plan[cell], forecasts) for cell, forecasts in pending]
+        fired_hours = []
+        for (cities, _), (alerts, sources) in zip(batch, evaluate_cells(batch, fired_hours)):
+            for city in cities:
+                for aggregator in aggregators:
+                    aggregator.add(city, alerts, sources)
+        for (cell, _), hours in zip(pending, fired_hours):
+            if cell in refreshed:
+                refresh_scheduler.observe(cell, hours)
+        if archive and pending:
+            try:
+                with span("archive", cells=len(pending)):
+                    archive.append(pending)
+            except OSError as e:
+                print("⚠️ Could not append to forecast archive:", e)
+        pending.clear()
+
+    for cell, forecasts in iter_fetch_plan(plan, deadline, refresh):
+        pending.append((cell, forecasts))
+        if closes_zone(cell) or len(pending) >= EVAL_BATCH:
+            evaluate_pending()
+    evaluate_pending()
+    return [aggregator.finish() for aggregator in aggregators]
 
-def save_last_tweet(tweet_text):
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GIST_TOKEN}"}
-    payload = {
-        "files": {
-            LAST_TWEET_FILENAME: {
-                "content": json.dumps({"text": tweet_text})
-            }
-        }
-    }
-    response = requests.patch(url, headers=headers, json=payload)
-    if response.status_code == 200:
-        print("✅ Last tweet saved to Gist")
-    else:
-        print("❌ Failed to save last tweet")
+def prepare_zone_alerts(zones):
+    return stream_zone_alerts(build_fetch_plan(zones), [zones])[0]
 
+def load_last_tweet():
+    return state_store.last_tweet()
+
+def save_last_tweet(tweet_text, alerts_hash=None):
+    state_store.set_last_tweet(tweet_text, alerts_hash)
+
+def alerts_fingerprint(zone_alerts, date_str):
+    """Stable hash of the day's zone alerts, independent of tweet wording."""
+    payload = json.dumps(
+        {"date": date_str, "alerts": sorted(zone_alerts.items())},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
 
 def format_zone_summary(zone_alerts):
     lines = []
     for zone, alert in zone_alerts.items():
         short_zone = zone.replace("Telangana", "").replace("Hyderabad", "").strip()
         name = short_zone or zone
+        if isinstance(alert, list):
+            alert = ", ".join(alert)
         lines.append(f"{zone}: {alert}")
     return "\n".join(lines)
 
@@ -445,20 +2104,145 @@ You're a serious Indian weather reporter. Write a crisp, informative tweet for t
 
 Requirements:
 - Max 280 characters
-- Start with 📰 or 📢 and a headline like: "📰 Telangana Weather"
+- Start with 📰 or 📢 and a headline like: "📰 {region} Weather"
 - Use 📍 to prefix zones
 - Sign off like "Details may evolve. Stay updated."
 - No hashtags or jokes
 """
 }
 
-def generate_ai_tweet(summary_text, date_str):
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 10))
+TWEET_CACHE_FILE = os.path.join(CACHE_DIR, "tweets.json")
+TWEET_CACHE_SIZE = 64
+
+# Headline and sign-off used by the template renderer for each AI style
+TEMPLATE_STYLES = {
+    "friendly": ("🌦️ Weather Update", "Stay safe!"),
+    "rhyming": ("🌤️ Sky's Tale", "Keep dry, don’t cry!"),
+    "quirky": ("🌈 Cloudy vibes", "Duck if it drizzles!"),
+    "news": ("📰 {region} Weather", "Details may evolve. Stay updated."),
+}
+
+class TweetCache:
+    """LRU of generated tweets keyed by (style, summary hash), kept on disk."""
+
+    def __init__(self, path=TWEET_CACHE_FILE, size=TWEET_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self.entries = None
+
+    @staticmethod
+    def key(style_key, text):
+        return f"{style_key}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = OrderedDict(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            self.entries = OrderedDict()
+
+    def get(self, key):
+        self._load()
+        tweet = self.entries.get(key)
+        if tweet is not None:
+            self.entries.move_to_end(key)
+        return tweet
+
+    def put(self, key, tweet):
+        self._load()
+        self.entries[key] = tweet
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(list(self.entries.items()), f, ensure_ascii=False)
+        except OSError as e:
+            print("⚠️ Could not write tweet cache:", e)
+
+tweet_cache = TweetCache()
+
+def call_with_budget(fn, budget=LLM_TIMEOUT):
+    """Run fn on a daemon thread and give up after budget seconds.
+
+    Returns None on timeout or error; the abandoned call can't keep the
+    process alive at exit.
+    """
+    result = {}
+
+    def run():
+        try:
+            result["value"] = fn()
+        except Exception as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(budget)
+    if worker.is_alive():
+        print(f"⏱️ Cohere took longer than {budget}s – falling back to template")
+        return None
+    if "error" in result:
+        print("❌ Cohere error:", result["error"])
+        return None
+    return result["value"]
+
+# Code points X counts as one character; everything else, emoji included, counts as two
+TWEET_LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+
+def tweet_length(text):
+    """Length of text as X counts it against the 280 limit."""
+    return sum(
+        1 if any(lo <= ord(ch) <= hi for lo, hi in TWEET_LIGHT_RANGES) else 2
+        for ch in text
+    )
+
+def clip_tweet(text, limit=280):
+    while tweet_length(text) > limit:
+        text = text[:-1]
+    return text
+
+def fit_tweet(head, lines, tail, limit=280):
+    """Join head, as many lines as fit, and tail within X's weighted character limit."""
+    text = head
+    budget = limit - tweet_length(tail) - 2
+    for line in lines:
+        # Skip lines that don't fit so a later, shorter one still can
+        if tweet_length(text) + 1 + tweet_length(line) > budget:
+            continue
+        text += "\n" + line
+    return f"{text}\n\n{tail}"
+
+def render_template_tweet(summary_text, style_key, date_str):
+    headline, signoff = TEMPLATE_STYLES[style_key]
+    lines = []
+    for line in summary_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("Current weather – "):
+            lines.append("🌡️ Now: " + line[len("Current weather – "):])
+        else:
+            lines.append(f"📍 {line}")
+    return fit_tweet(f"{headline.format(region=REGION_NAME)} ({date_str})", lines, signoff)
+
+def render_pleasant_template(date_str, current_weather=None):
+    lines = [f"No major weather events expected across {REGION_NAME} today."]
+    if current_weather:
+        lines.append(f"🌡️ Now: {current_weather}")
+    return fit_tweet(f"🌤️ Weather Update ({date_str})", lines, "Enjoy your day!")
+
+def generate_ai_tweet(summary_text, date_str, use_llm=True):
     bullet_summary = "\n".join(
         [f"- {line}" for line in summary_text.splitlines() if line.strip()]
     )
 
-    style_key = random.choice(list(AI_TWEET_STYLES.keys()))
-    style_prompt = AI_TWEET_STYLES[style_key].strip().format(date=date_str)
+    style_key = TWEET_STYLE or random.choice(list(AI_TWEET_STYLES.keys()))
+    style_prompt = AI_TWEET_STYLES[style_key].strip().format(date=date_str, region=REGION_NAME)
 
     prompt = f"""{style_prompt}
 
@@ -470,23 +2254,31 @@ Tweet:
 
     print(f"🧠 Using style: {style_key}")
 
-    try:
-        response = cohere_client.chat(
-            model="command-a-03-2025",
-            message=prompt,
-            temperature=0.7,
-            max_tokens=280,
-            stop_sequences=["--"],
-        )
-        tweet = response.text.strip()
-        return tweet[:280]
-    except Exception as e:
-        print("❌ Cohere error:", e)
-        return None
-        
-def generate_pleasant_weather_tweet(date_str, current_weather=None):
+    if not use_llm:
+        return render_template_tweet(summary_text, style_key, date_str)
+
+    cache_key = TweetCache.key(style_key, summary_text)
+    cached = tweet_cache.get(cache_key)
+    if cached:
+        print("♻️ Reusing cached tweet for this summary")
+        return cached
+
+    response = call_with_budget(lambda: get_cohere_client().chat(
+        model="command-a-03-2025",
+        message=prompt,
+        temperature=0.7,
+        max_tokens=280,
+        stop_sequences=["--"],
+    ))
+    tweet = clip_tweet(response.text.strip()) if response else ""
+    if tweet:
+        tweet_cache.put(cache_key, tweet)
+        return tweet
+    return render_template_tweet(summary_text, style_key, date_str)
+
+def generate_pleasant_weather_tweet(date_str, current_weather=None, use_llm=True):
     prompt = f"""
-You're a friendly Indian weather bot. Today’s weather in Telangana is calm.
+You're a friendly Indian weather bot. Today’s weather in {REGION_NAME} is calm.
 
 Write 1 cheerful tweet:
 - Start with emoji headline: “🌤️ Weather Update”
@@ -496,39 +2288,137 @@ Write 1 cheerful tweet:
 
 Tweet:
 """
+    if not use_llm:
+        return render_pleasant_template(date_str, current_weather)
+
+    cache_key = TweetCache.key("pleasant", f"{date_str}|{current_weather}")
+    cached = tweet_cache.get(cache_key)
+    if cached:
+        print("♻️ Reusing cached pleasant tweet")
+        return cached
+
+    response = call_with_budget(lambda: get_cohere_client().generate(
+        model="command-r-plus",
+        prompt=prompt.strip(),
+        max_tokens=200,
+        temperature=0.7,
+        stop_sequences=["--"]
+    ))
+    tweet = clip_tweet(response.generations[0].text.strip()) if response else ""
+    if tweet:
+        tweet_cache.put(cache_key, tweet)
+        return tweet
+    return render_pleasant_template(date_str, current_weather)
+
+def post_tweet(tweet_text, dry_run=False):
+    """Post a tweet; returns True once it is live."""
+    if dry_run:
+        print("🧪 Dry run – not posting.")
+        return False
+
+    import tweepy
     try:
-        response = cohere_client.generate(
-            model="command-r-plus",
-            prompt=prompt.strip(),
-            max_tokens=200,
-            temperature=0.7,
-            stop_sequences=["--"]
-        )
-        return response.generations[0].text.strip()[:280]
+        res = get_twitter_client().create_tweet(text=tweet_text)
+        print("✅ Tweet posted! Tweet ID:", res.data["id"])
+        return True
+    except tweepy.TooManyRequests:
+        print("❌ Rate limit hit.")
     except Exception as e:
-        print("❌ Cohere error (pleasant):", e)
-        return None
-
-def tweet_weather():
+        print("❌ Error tweeting:", e)
+    return False
+
+def flush_state(dry_run=False):
+    coords_cache.flush()
+    response_cache.save()
+    refresh_scheduler.save()
+    if not dry_run:
+        state_store.flush()
+
+RUN_REPORT_PATH = os.getenv("RUN_REPORT_PATH", os.path.join(CACHE_DIR, "run_report.json"))
+
+def start_profiling(profile_dir):
+    global profiler
+    if not profile_dir:
+        return
+    import cProfile, tracemalloc
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+
+def stop_profiling(profile_dir):
+    global profiler
+    if profiler is None:
+        return
+    import pstats, tracemalloc
+    os.makedirs(profile_dir, exist_ok=True)
+    profiler.dump_stats(os.path.join(profile_dir, "cpu.pstats"))
+    with open(os.path.join(profile_dir, "cpu.txt"), "w") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(os.path.join(profile_dir, "memory.txt"), "w") as f:
+        f.write(f"current={current} peak={peak}\n")
+        for stat in snapshot.statistics("lineno")[:30]:
+            f.write(f"{stat}\n")
+    run_report.info["peak_traced_memory_bytes"] = peak
+    profiler = None
+    print(f"🔬 Profile written to {profile_dir}")
+
+def write_reports(report_path=RUN_REPORT_PATH, metrics_path=None):
+    try:
+        if report_path:
+            os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+            run_report.write_json(report_path)
+            print(f"📊 Run report written to {report_path}")
+        if metrics_path:
+            run_report.write_prometheus(metrics_path)
+    except OSError as e:
+        print("⚠️ Could not write run report:", e)
+
+def tweet_weather(dry_run=False, report_path=RUN_REPORT_PATH, metrics_path=None, profile_dir=None):
+    run_report.reset()
+    run_report.info["dry_run"] = dry_run
+    start_profiling(profile_dir)
+    try:
+        post_weather_update(dry_run)
+    finally:
+        with span("flush_state"):
+            flush_state(dry_run)
+        run_report.finished_at = time.time()
+        stop_profiling(profile_dir)
+        write_reports(report_path, metrics_path)
+
+def post_weather_update(dry_run=False):
     date_str = datetime.now().strftime("%d %b")
 
-    tg_alerts = prepare_zone_alerts(ZONES)
-    hyd_alerts = prepare_zone_alerts(HYD_ZONES)
+    with span("build_fetch_plan"):
+        plan = build_fetch_plan(ZONES, HYD_ZONES)
+    with span("fetch_and_evaluate", profile=True):
+        tg_alerts, hyd_alerts = stream_zone_alerts(plan, [ZONES, HYD_ZONES])
 
     combined_alerts = {**tg_alerts, **hyd_alerts}
+    alerts_hash = alerts_fingerprint(combined_alerts, date_str)
+    run_report.info.update(alerts=combined_alerts, alerts_hash=alerts_hash)
 
-    current_weather_data = fetch_current_weather("Hyderabad")
-    current_summary = summarize_current_weather(current_weather_data)
-
-    last_tweet = load_last_tweet()
+    with span("load_state"):
+        last_tweet = load_last_tweet()
     previous_text = last_tweet["text"] if last_tweet else None
+    if last_tweet and last_tweet.get("alerts_hash") == alerts_hash and not dry_run:
+        print("⏭️ Alerts unchanged since last tweet – skipping.")
+        run_report.info["outcome"] = "unchanged"
+        return
+
+    with span("fetch_current_weather"):
+        current_weather_data = fetch_current_weather(CURRENT_WEATHER_CITY)
+    current_summary = summarize_current_weather(current_weather_data)
 
     if combined_alerts:
         summary_text = format_zone_summary(combined_alerts)
         if current_summary:
             summary_text = f"Current weather – {current_summary}\n\n" + summary_text
 
-        tweet_text = generate_ai_tweet(summary_text, date_str)
+        with span("generate_tweet"):
+            tweet_text = generate_ai_tweet(summary_text, date_str, use_llm=not dry_run)
 
         if tweet_text:
             if tweet_text == previous_text:
@@ -537,35 +2427,208 @@ def tweet_weather():
 
             print("\n📝 Tweet content:\n", tweet_text, "\n")
 
-            try:
-                res = client.create_tweet(text=tweet_text)
-                print("✅ Weather alert tweet posted! Tweet ID:", res.data["id"])
-                save_last_tweet(tweet_text)
-            except tweepy.TooManyRequests:
-                print("❌ Rate limit hit.")
-            except Exception as e:
-                print("❌ Error tweeting:", e)
+            with span("post_tweet"):
+                posted = post_tweet(tweet_text, dry_run)
+            run_report.info["outcome"] = "posted" if posted else "not_posted"
+            if posted:
+                save_last_tweet(tweet_text, alerts_hash)
         else:
             print("❌ Failed to generate weather alert tweet.")
     else:
         print("ℹ️ No alerts found – tweeting a pleasant weather update.")
-        tweet_text = generate_pleasant_weather_tweet(date_str, current_summary)
+        with span("generate_tweet"):
+            tweet_text = generate_pleasant_weather_tweet(date_str, current_summary, use_llm=not dry_run)
 
         if tweet_text:
             if tweet_text == previous_text:
                 print("⏭️ Duplicate pleasant tweet – skipping.")
                 return
 
-            try:
-                res = client.create_tweet(text=tweet_text)
-                print("✅ Pleasant weather tweet posted! Tweet ID:", res.data["id"])
-                save_last_tweet(tweet_text)
-            except tweepy.TooManyRequests:
-                print("❌ Rate limit hit while tweeting pleasant weather.")
-            except Exception as e:
-                print("❌ Error tweeting pleasant weather:", e)
+            print("\n📝 Tweet content:\n", tweet_text, "\n")
+
+            with span("post_tweet"):
+                posted = post_tweet(tweet_text, dry_run)
+            run_report.info["outcome"] = "posted" if posted else "not_posted"
+            if posted:
+                save_last_tweet(tweet_text, alerts_hash)
         else:
             print("❌ Failed to generate pleasant weather tweet.")
 
+DAEMON_INTERVAL_MINUTES = int(os.getenv("DAEMON_INTERVAL_MINUTES", 180))
+
+def run_daemon(interval_minutes=DAEMON_INTERVAL_MINUTES, dry_run=False, regions=None, workers=None,
+               **report_options):
+    """Stay resident and run tweet_weather() every interval_minutes.
+
+    Sessions, the coordinate/response/tweet caches and the Gist state stay in
+    memory between runs. SIGINT/SIGTERM stop the loop after the current run
+    and flush state before exiting. With regions, each run is run_regions().
+    """
+    import schedule
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"🛑 Received signal {signum} – shutting down after the current run.")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    def run_once():
+        try:
+            if regions:
+                run_regions(regions, dry_run, workers)
+            else:
+                tweet_weather(dry_run, **report_options)
+        except Exception as e:
+            print(f"❌ Run failed: {type(e).__name__} - {e}")
+
+    # The quota is split over the runs left today, so the scheduler needs the real interval
+    refresh_scheduler.interval_minutes = interval_minutes
+    schedule.every(interval_minutes).minutes.do(run_once)
+    print(f"⏰ Daemon started – running every {interval_minutes} minutes.")
+    run_once()
+    while not stop.is_set():
+        schedule.run_pending()
+        stop.wait(min(60, max(1, schedule.idle_seconds() or 1)))
+
+    flush_state(dry_run)
+    print("👋 Daemon stopped.")
+
+REGIONS_FILE = os.getenv("REGIONS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json"))
+
+# Per-account settings a region's env_prefix replaces, e.g. AP_API_KEY for API_KEY
+REGION_ENV_VARS = ("API_KEY", "API_SECRET", "ACCESS_TOKEN", "ACCESS_SECRET", "BEARER_TOKEN", "GIST_ID", "GIST_TOKEN")
+
+def load_regions(path=REGIONS_FILE):
+    with open(path, encoding="utf-8") as f:
+        regions = json.load(f)["regions"]
+    base = os.path.dirname(os.path.abspath(path))
+    for region in regions:
+        region["zones_file"] = os.path.join(base, region.get("zones_file", "zones.json"))
+    return regions
+
+def region_slug(region):
+    return region["name"].lower().replace(" ", "-")
+
+def region_zone_sets(region, zone_sets):
+    """The region's (state, city) zone sets; the city set may be empty."""
+    names = region.get("zone_sets") or list(zone_sets)
+    return zone_sets[names[0]], zone_sets[names[1]] if len(names) > 1 else {}
+
+def configure_region(region):
+    """Point this process's feed globals at one region."""
+    global ZONE_SETS, CONFIG_COORDS, ZONES, HYD_ZONES, location_index
+    global REGION_NAME, CURRENT_WEATHER_CITY, TWEET_STYLE, state_store, tweet_cache, forecast_archive
+    global refresh_scheduler
+
+    prefix = region.get("env_prefix")
+    if prefix:
+        for name in REGION_ENV_VARS:
+            value = os.getenv(prefix + name)
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    ZONE_SETS, CONFIG_COORDS = load_zone_config(region["zones_file"])
+    ZONES, HYD_ZONES = region_zone_sets(region, ZONE_SETS)
+    location_index = build_location_index(CONFIG_COORDS)
+    REGION_NAME = region["name"]
+    CURRENT_WEATHER_CITY = region.get("current_city", CURRENT_WEATHER_CITY)
+    TWEET_STYLE = region.get("style") or None
+    state_store = GistStateStore()
+    refresh_scheduler = RefreshScheduler(cache_only=True)
+    tweet_cache = TweetCache(path=os.path.join(CACHE_DIR, f"tweets-{region_slug(region)}.json"))
+    if FORECAST_ARCHIVE_DIR:
+        forecast_archive = ForecastArchive(os.path.join(FORECAST_ARCHIVE_DIR, region_slug(region)))
+
+def run_region(region, dry_run=False):
+    """Process pool entry point: one region's full run."""
+    configure_region(region)
+    tweet_weather(dry_run, report_path=os.path.join(CACHE_DIR, f"run_report-{region_slug(region)}.json"))
+    return run_report.info.get("outcome")
+
+def prefetch_regions(regions, deadline=FETCH_DEADLINE, dry_run=False):
+    """Fetch every grid cell of every region once, into the on-disk caches.
+
+    Regions are then run in their own processes, which only read the
+    shared response and coordinate caches: provider quotas are per key, so
+    this process is the only one that plans fetches or counts calls.
+    """
+    zone_sets = []
+    for region in regions:
+        sets, coords = load_zone_config(region["zones_file"])
+        for city, latlon in coords.items():
+            CONFIG_COORDS.setdefault(city, latlon)
+        zone_sets.extend(region_zone_sets(region, sets))
+    plan = build_fetch_plan(*zone_sets)
+    refresh = refresh_scheduler.plan(list(plan))
+    refreshed = set().union(*refresh.values())
+    # Refreshed cells are evaluated here too, so the scheduler sees how they moved
+    fetched = [(cell, forecasts) for cell, forecasts in iter_fetch_plan(plan, deadline, refresh)
+               if cell in refreshed]
+    fired_hours = []
+    evaluate_cells([(plan[cell], forecasts) for cell, forecasts in fetched], fired_hours)
+    for (cell, _), hours in zip(fetched, fired_hours):
+        refresh_scheduler.observe(cell, hours)
+    # Pending geocodes go to the Gist here; workers load them with nothing pending
+    flush_state(dry_run)
+    return plan
+
+def run_regions(regions, dry_run=False, workers=None):
+    """Run several regional feeds concurrently across a process pool."""
+    start = time.perf_counter()
+    # All forecast traffic happens in this process, so it gets a report of its own
+    run_report.reset()
+    run_report.info.update(dry_run=dry_run, regions=[region["name"] for region in regions])
+    try:
+        with span("prefetch_regions"):
+            plan = prefetch_regions(regions, dry_run=dry_run)
+    finally:
+        run_report.finished_at = time.time()
+        write_reports(os.path.join(CACHE_DIR, "run_report-prefetch.json"))
+    print(f"🗺️ Prefetched {len(plan)} grid cells for {len(regions)} regions "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers or len(regions), mp_context=context) as pool:
+        futures = {pool.submit(run_region, region, dry_run): region["name"] for region in regions}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                print(f"🏁 {name}: {future.result()}")
+            except Exception as e:
+                print(f"❌ Region {name} failed: {type(e).__name__} - {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Post Telangana weather alerts to X.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="run the full fetch/alert pipeline without Cohere, posting or saving state")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and run on a schedule with warm caches")
+    parser.add_argument("--every-minutes", type=int, default=DAEMON_INTERVAL_MINUTES,
+                        help="run interval in daemon mode (default: %(default)s)")
+    parser.add_argument("--report", default=RUN_REPORT_PATH,
+                        help="where to write the JSON run report (default: %(default)s)")
+    parser.add_argument("--metrics", default=None,
+                        help="also write Prometheus text-format metrics to this file")
+    parser.add_argument("--profile", nargs="?", const="profile", default=None, metavar="DIR",
+                        help="capture cProfile and tracemalloc output for CPU-side stages into DIR")
+    parser.add_argument("--regions", nargs="?", const=REGIONS_FILE, default=None, metavar="FILE",
+                        help="run every region in FILE (default: regions.json) across a process pool")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for --regions (default: one per region)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    tweet_weather()
+    args = parse_args()
+    report_options = {"report_path": args.report, "metrics_path": args.metrics, "profile_dir": args.profile}
+    regions = load_regions(args.regions) if args.regions else None
+    if args.daemon:
+        run_daemon(args.every_minutes, dry_run=args.dry_run, regions=regions, workers=args.workers,
+                   **report_options)
+    elif regions:
+        run_regions(regions, dry_run=args.dry_run, workers=args.workers)
+    else:
+        tweet_weather(dry_run=args.dry_run, **report_options)